@@ -0,0 +1,192 @@
+"""
+End-to-end throughput benchmark for the dev-agent commands, fully offline.
+
+Runs generate, review and respond in fresh interpreters against the local fake
+OpenAI and GitHub servers in benchmarks/fakes.py (and a local bare git repository
+for generate's push), and reports for each command the wall time, OpenAI requests,
+429s, tokens sent, GitHub API calls and the peak RSS of the agent process.
+
+--files takes a comma separated list of PR sizes to show how the review and respond
+costs, and especially peak RSS, scale with the number of changed files. With --prs
+above 1, review and respond run once over all open PRs with --all-open. With --poll,
+each command first runs once unmeasured to warm the GitHub response cache, and the
+measured runs then poll the unchanged PRs, as a cron job would.
+
+Usage:
+    python benchmarks/e2e.py [--files 10] [--comments 20] [--lines 200] [--latency-ms 200]
+                             [--rate-limit-every 0] [--runs 3] [--json results.json]
+    python benchmarks/e2e.py --scenarios review,respond --files 10,100,500 --comments 500 --runs 1
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fakes import FakeGitHub, FakeOpenAI
+
+SCENARIOS = ["generate", "review", "respond"]
+
+def _git(*args: str, cwd: str = None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+def _make_bare_repo(root: Path) -> str:
+    """Create a bare repository with one commit on main to stand in for the GitHub remote."""
+    bare = root / "remote.git"
+    seed = root / "seed"
+    _git("init", "--bare", "--initial-branch=main", str(bare))
+    _git("init", "--initial-branch=main", str(seed))
+    (seed / "README.md").write_text("benchmark\n")
+    _git("add", "README.md", cwd=str(seed))
+    _git("-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-m", "init", cwd=str(seed))
+    _git("push", str(bare), "main", cwd=str(seed))
+    return str(bare)
+
+def _run_agent(args: list, env: dict, cwd: str) -> dict:
+    """Run dev-agent in a fresh interpreter and return its wall time, exit status and peak RSS."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "dev_agent", *args], env=env, cwd=cwd,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    stderr = process.stderr.read()
+    # wait4 reports the resource usage of this child alone
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_bytes = usage.ru_maxrss if platform.system() == "Darwin" else usage.ru_maxrss * 1024
+    return {
+        "wall_s": wall,
+        "exit_code": process.returncode,
+        "peak_rss_mb": rss_bytes / (1024 * 1024),
+        "stderr_tail": stderr.decode(errors="replace")[-2000:],
+    }
+
+def _scenario_args(name: str, branch: str, prs: int) -> list:
+    if name == "generate":
+        return ["generate", "Create a small benchmark service", "bench-generate", "--create-mr"]
+    target = ["--all-open"] if prs > 1 else [branch]
+    if name == "review":
+        return ["review", *target]
+    return ["respond", *target, "--reprocess"]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated subset of generate,review,respond")
+    parser.add_argument("--files", default="10", help="Files changed in the synthetic PR, or a comma separated list of sizes")
+    parser.add_argument("--comments", type=int, default=20, help="Review comments on the synthetic PR")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per file")
+    parser.add_argument("--prs", type=int, default=1, help="Open pull requests; above 1, review and respond use --all-open")
+    parser.add_argument("--generated-files", type=int, default=10, help="Files in the generated project")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Fake OpenAI latency per request")
+    parser.add_argument("--stream-chunk-ms", type=float, default=5, help="Delay between streamed chunks")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth OpenAI request with a 429")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--poll", action="store_true", help="Measure re-runs against a warm GitHub response cache")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary workspace")
+    options = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="dev_agent_bench_"))
+    bare = _make_bare_repo(root)
+    openai_server = FakeOpenAI(
+        latency=options.latency_ms / 1000, stream_chunk_delay=options.stream_chunk_ms / 1000,
+        rate_limit_every=options.rate_limit_every, generated_files=options.generated_files
+    ).start()
+    sizes = [int(size) for size in options.files.split(",") if size.strip()]
+    github_server = FakeGitHub(
+        files=sizes[0], lines=options.lines, comments=options.comments, bare_repo=bare, prs=options.prs
+    ).start()
+
+    src = str(Path(__file__).resolve().parent.parent / "src")
+    results = []
+    try:
+        scenarios = [scenario.strip() for scenario in options.scenarios.split(",") if scenario.strip()]
+        for name, files in [(name, files) for files in sizes for name in scenarios]:
+            github_server.file_count = files
+            runs = []
+            # Run 0 only warms the GitHub cache when polling
+            for run in range(-1 if options.poll else 0, options.runs):
+                github_server.reset()
+                openai_server.reset_counters()
+                github_server.reset_counters()
+                workspace = root / f"{name}-{files}-{run}"
+                github_cache = root / f"github-cache-{name}-{files}" if options.poll else root / f"github-cache-{name}-{files}-{run}"
+                env = dict(
+                    os.environ,
+                    PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")])),
+                    NO_PROXY="127.0.0.1,localhost",
+                    OPENAI_API_KEY="sk-bench",
+                    OPENAI_API_BASE=f"{openai_server.url}/v1",
+                    GITHUB_TOKEN="ghp_bench",
+                    GITHUB_API_URL=github_server.url,
+                    GITHUB_REPO_OWNER=github_server.owner,
+                    GITHUB_REPO_NAME=github_server.repo,
+                    GIT_REMOTE_URL=bare,
+                    GIT_COMMITTER_NAME="bench",
+                    GIT_COMMITTER_EMAIL="bench@example.com",
+                    WORKSPACE_PATH=str(workspace),
+                    LLM_CACHE_ENABLED="false",
+                    STATE_DB_PATH=str(root / f"state-{name}-{files}-{run}.db"),
+                    GITHUB_CACHE_DIR=str(github_cache),
+                    LLM_RETRY_BASE_DELAY="0.05",
+                )
+                result = _run_agent(_scenario_args(name, github_server.branch, options.prs), env, str(root))
+                if run < 0:
+                    continue
+                result.update(
+                    openai_requests=openai_server.calls["requests"],
+                    openai_throttled=openai_server.calls["throttled"],
+                    tokens_sent=openai_server.calls["prompt_tokens"],
+                    tokens_received=openai_server.calls["completion_tokens"],
+                    github_calls=sum(github_server.calls.values()),
+                    github_not_modified=sum(count for route, count in github_server.calls.items() if route.endswith(" 304")),
+                    github_calls_by_route=dict(github_server.calls),
+                )
+                runs.append(result)
+                if result["exit_code"] != 0:
+                    print(f"{name} ({files} files) run {run} exited with {result['exit_code']}:\n{result['stderr_tail']}", file=sys.stderr)
+
+            median_run = sorted(runs, key=lambda result: result["wall_s"])[len(runs) // 2]
+            results.append({
+                "scenario": name,
+                "files": files,
+                "runs": len(runs),
+                "wall_s": statistics.median(result["wall_s"] for result in runs),
+                "peak_rss_mb": max(result["peak_rss_mb"] for result in runs),
+                "failed_runs": sum(1 for result in runs if result["exit_code"] != 0),
+                **{key: median_run[key] for key in (
+                    "openai_requests", "openai_throttled", "tokens_sent", "tokens_received",
+                    "github_calls", "github_not_modified", "github_calls_by_route"
+                )},
+            })
+    finally:
+        openai_server.stop()
+        github_server.stop()
+        if not options.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'scenario':<10} {'files':>6} {'wall s':>8} {'openai':>7} {'429s':>5} {'tokens sent':>12} {'github':>7} {'304s':>5} {'peak RSS MB':>12} {'failed':>7}")
+    for result in results:
+        print(
+            f"{result['scenario']:<10} {result['files']:6d} {result['wall_s']:8.2f} {result['openai_requests']:7d} {result['openai_throttled']:5d} "
+            f"{result['tokens_sent']:12d} {result['github_calls']:7d} {result['github_not_modified']:5d} {result['peak_rss_mb']:12.1f} {result['failed_runs']:7d}"
+        )
+
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump({"options": vars(options), "results": results}, f, indent=2)
+
+    return 1 if any(result["failed_runs"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,568 @@
+"""
+Local stand-ins for the OpenAI and GitHub APIs used by the end-to-end benchmarks.
+
+Both servers run in background threads on 127.0.0.1 and count every request, so a
+benchmark can point dev-agent at them (OPENAI_API_BASE, GITHUB_API_URL) and report
+API usage without network access.
+"""
+
+import re
+import json
+import time
+import base64
+import hashlib
+import threading
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, status: int, data, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. a cancelled hedged request
+            self.close_connection = True
+
+class _FakeServer:
+    """Base class running a handler-bound ThreadingHTTPServer in a daemon thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        handler = type("Handler", (self.handler_class,), {"fake": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    handler_class = _Handler
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.calls[name] += amount
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls.clear()
+
+# --- OpenAI ---------------------------------------------------------------------------
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        fake: FakeOpenAI = self.fake
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        request = self._body()
+        messages = request.get("messages", [])
+        fake.count("requests")
+        fake.count("prompt_tokens", sum(len(message.get("content") or "") for message in messages) // 4)
+
+        if fake.should_throttle():
+            fake.count("throttled")
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"Retry-After": str(fake.retry_after)}
+            )
+            return
+
+        time.sleep(fake.latency)
+        content = fake.respond(messages)
+        fake.count("completion_tokens", len(content) // 4)
+
+        if request.get("stream"):
+            self._stream(content, request.get("model", "gpt-4"))
+            return
+
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": sum(len(message.get("content") or "") for message in messages) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (sum(len(message.get("content") or "") for message in messages) + len(content)) // 4,
+            },
+        })
+
+    def _stream(self, content: str, model: str):
+        fake: FakeOpenAI = self.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        size = fake.stream_chunk_chars
+        for offset in range(0, len(content), size):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[offset:offset + size]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if fake.stream_chunk_delay:
+                time.sleep(fake.stream_chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class FakeOpenAI(_FakeServer):
+    """
+    Chat completions endpoint returning canned responses for each dev-agent prompt.
+
+    Args:
+        latency (float): Seconds to wait before answering each request.
+        stream_chunk_chars (int): Characters per streamed chunk.
+        stream_chunk_delay (float): Seconds between streamed chunks.
+        rate_limit_every (int): Answer every Nth request with a 429 (0 disables).
+        retry_after (float): Retry-After value sent with injected 429s.
+        generated_files (int): Files in a generated project.
+        generated_lines (int): Lines per generated file.
+    """
+
+    handler_class = _OpenAIHandler
+
+    def __init__(self, latency: float = 0.0, stream_chunk_chars: int = 64, stream_chunk_delay: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 0.1, generated_files: int = 10, generated_lines: int = 40):
+        super().__init__()
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay = stream_chunk_delay
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.generated_files = generated_files
+        self.generated_lines = generated_lines
+        self._seen = 0
+
+    def should_throttle(self) -> bool:
+        if not self.rate_limit_every:
+            return False
+        with self.lock:
+            self._seen += 1
+            return self._seen % self.rate_limit_every == 0
+
+    def respond(self, messages: List[dict]) -> str:
+        system = messages[0].get("content", "") if messages else ""
+        user = messages[-1].get("content", "") if messages else ""
+
+        if "=== FILE:" in system:
+            blocks = []
+            for index in range(self.generated_files):
+                body = '\n'.join(f"    value_{line} = {line}" for line in range(self.generated_lines))
+                blocks.append(f"=== FILE: app/module_{index}.py ===\ndef handler_{index}():\n{body}\n    return value_0\n")
+            return ''.join(blocks)
+
+        if '"edits"' in system:
+            edits = [
+                {
+                    "comment_id": int(comment_id),
+                    "change_needed": True,
+                    "suggested_change": f"    value = {comment_id}  # addressed",
+                    "response": "Updated as suggested.",
+                }
+                for comment_id in re.findall(r"Comment ID (\d+)", user)
+            ]
+            return json.dumps({"edits": edits})
+
+        # Reviews: flag the first numbered lines of the excerpt, or the first lines of the file
+        lines = [int(line) for line in re.findall(r"^\s*(\d+)[+ ] ", user, re.MULTILINE)[:2]] or [1, 2]
+        return json.dumps({
+            "issues": [{"line": line, "message": f"Consider simplifying line {line}."} for line in lines],
+            "summary": "Mostly fine, a couple of nits.",
+            "has_issues": True,
+        })
+
+# --- GitHub ---------------------------------------------------------------------------
+
+def _sha(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def _blob_sha(text: str) -> str:
+    """The SHA git gives a blob with this content, as GitHub reports for files."""
+    data = text.encode()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class _GitHubHandler(_Handler):
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def _dispatch(self, method: str):
+        fake: FakeGitHub = self.fake
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = self._body() if method != "GET" else {}
+        for pattern, route_method, name in fake.ROUTES:
+            match = re.fullmatch(pattern, parsed.path)
+            if match and route_method == method:
+                with fake.lock:
+                    status, data = getattr(fake, name)(*match.groups(), query=query, body=body)
+                self.not_modified = False
+                if isinstance(data, list):
+                    self._send_page(status, data, parsed.path, query)
+                else:
+                    self._send_json(status, data)
+                # Conditional requests answered with 304 are counted separately
+                fake.count(f"{method} {name}" + (" 304" if self.not_modified else ""))
+                return
+        fake.count(f"{method} unknown")
+        self._send_json(404, {"message": "Not Found", "path": parsed.path})
+
+    def _send_json(self, status: int, data, headers: Optional[Dict[str, str]] = None):
+        """Send a response with an ETag, or 304 Not Modified if the client already has it."""
+        if self.command != "GET" or status != 200:
+            super()._send_json(status, data, headers)
+            return
+        etag = f'"{hashlib.sha1(json.dumps(data).encode()).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.not_modified = True
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super()._send_json(status, data, dict(headers or {}, ETag=etag))
+
+    def _send_page(self, status: int, items: list, path: str, query: dict):
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        last = max(1, -(-len(items) // per_page))
+        headers = {}
+        links = []
+        if page < last:
+            links.append(f'<{self._page_url(path, query, page + 1)}>; rel="next"')
+            links.append(f'<{self._page_url(path, query, last)}>; rel="last"')
+        if links:
+            headers["Link"] = ", ".join(links)
+        self._send_json(status, items[(page - 1) * per_page:page * per_page], headers)
+
+    def _page_url(self, path: str, query: dict, page: int) -> str:
+        return f"{self.fake.url}{path}?{urlencode(dict(query, page=page))}"
+
+class FakeGitHub(_FakeServer):
+    """
+    REST-compatible subset of the GitHub API serving synthetic pull requests.
+
+    There are `prs` open PRs, on `branch`, `branch`-2 and so on. Each changes the same
+    `files` Python files of `lines` lines each and carries the same `comments` review
+    comments spread across them. Git Data API writes (trees, commits, refs) are
+    accepted and tracked in memory. If bare_repo is given, branch lookups and new refs
+    are mirrored into that local bare repository so generate can push to it, and the
+    PR head commit is written there as refs/pull/<number>/head so it can be fetched.
+    """
+
+    handler_class = _GitHubHandler
+
+    OWNER_REPO = r"/repos/([^/]+)/([^/]+)"
+    ROUTES = [
+        (r"/user", "GET", "get_authenticated_user"),
+        (r"/users/([^/]+)", "GET", "get_user"),
+        (OWNER_REPO, "GET", "get_repo"),
+        (OWNER_REPO + r"/branches/(.+)", "GET", "get_branch"),
+        (OWNER_REPO + r"/pulls", "GET", "list_pulls"),
+        (OWNER_REPO + r"/pulls", "POST", "create_pull"),
+        (OWNER_REPO + r"/pulls/(\d+)", "GET", "get_pull"),
+        (OWNER_REPO + r"/pulls/(\d+)/files", "GET", "list_files"),
+        (OWNER_REPO + r"/pulls/(\d+)/comments", "GET", "list_comments"),
+        (OWNER_REPO + r"/pulls/(\d+)/comments", "POST", "create_comment"),
+        (OWNER_REPO + r"/pulls/(\d+)/comments/(\d+)/replies", "POST", "create_reply"),
+        (OWNER_REPO + r"/pulls/(\d+)/reviews", "POST", "create_review"),
+        (OWNER_REPO + r"/issues/(\d+)/comments", "POST", "create_issue_comment"),
+        (OWNER_REPO + r"/contents/(.+)", "GET", "get_contents"),
+        (OWNER_REPO + r"/commits/([0-9a-f]+)", "GET", "get_commit"),
+        (OWNER_REPO + r"/git/refs?/(.+)", "GET", "get_ref"),
+        (OWNER_REPO + r"/git/refs", "POST", "create_ref"),
+        (OWNER_REPO + r"/git/refs/(.+)", "PATCH", "update_ref"),
+        (OWNER_REPO + r"/git/commits/([0-9a-f]+)", "GET", "get_git_commit"),
+        (OWNER_REPO + r"/git/commits", "POST", "create_git_commit"),
+        (OWNER_REPO + r"/git/trees/([0-9a-f]+)", "GET", "get_tree"),
+        (OWNER_REPO + r"/git/trees", "POST", "create_tree"),
+        (OWNER_REPO + r"/git/blobs", "POST", "create_blob"),
+        (OWNER_REPO + r"/git/blobs/([0-9a-f]+)", "GET", "get_blob"),
+    ]
+
+    HUNK_LINES = 12
+
+    def __init__(self, owner: str = "bench", repo: str = "bench-repo", branch: str = "feature/bench",
+                 files: int = 10, lines: int = 200, comments: int = 20, bare_repo: Optional[str] = None,
+                 prs: int = 1):
+        super().__init__()
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.file_count = files
+        self.lines = lines
+        self.comment_count = comments
+        self.bare_repo = bare_repo
+        self.pr_count = prs
+        self.reset()
+
+    # State
+
+    def reset(self):
+        """Restore the synthetic PR and forget everything written since."""
+        self.contents: Dict[str, str] = {}
+        for index in range(self.file_count):
+            body = '\n'.join(f"    total += {line}  # step {line}" for line in range(self.lines - 3))
+            self.contents[f"src/module_{index}.py"] = f"def compute_{index}():\n    total = 0\n{body}\n    return total\n"
+        self.paths = list(self.contents)
+        self.head_sha = self._write_pull_heads() if self.bare_repo else _sha("head")
+        self.branches = [self.branch] + [f"{self.branch}-{number}" for number in range(2, self.pr_count + 1)]
+        self.refs = {f"heads/{branch}": self.head_sha for branch in self.branches}
+        self.trees = {_sha("tree"): dict(self.contents)}
+        self.blobs: Dict[str, str] = {}
+        self.commits = {self.head_sha: {"tree": _sha("tree"), "parents": []}}
+        self.reviews: List[dict] = []
+        self.review_comments = [
+            {
+                "id": 1000 + index,
+                "path": self.paths[index % len(self.paths)],
+                "line": index // len(self.paths) % self.HUNK_LINES + 1,
+                "body": f"Please rename the variable on this line ({index}).",
+            }
+            for index in range(self.comment_count)
+        ] if self.paths else []
+        self.created_comments: List[dict] = []
+        self.pulls: List[dict] = [self._pull(number, branch) for number, branch in enumerate(self.branches, 1)]
+
+    def _repo_url(self) -> str:
+        return f"{self.url}/repos/{self.owner}/{self.repo}"
+
+    def _pull(self, number: int, branch: str, title: str = "Synthetic benchmark PR") -> dict:
+        return {
+            "id": number,
+            "number": number,
+            "state": "open",
+            "title": title,
+            "url": f"{self._repo_url()}/pulls/{number}",
+            "html_url": f"https://github.invalid/{self.owner}/{self.repo}/pull/{number}",
+            "issue_url": f"{self._repo_url()}/issues/{number}",
+            "head": {"ref": branch, "sha": self.refs.get(f"heads/{branch}", self.head_sha), "label": f"{self.owner}:{branch}"},
+            "base": {"ref": "main", "sha": _sha("main"), "label": f"{self.owner}:main"},
+        }
+
+    def _patch(self, path: str) -> str:
+        """A hunk that adds the last two of the first HUNK_LINES lines."""
+        lines = self.contents[path].split('\n')[:self.HUNK_LINES]
+        body = [f" {line}" for line in lines[:-2]] + [f"+{line}" for line in lines[-2:]]
+        return f"@@ -1,{len(lines) - 2} +1,{len(lines)} @@\n" + '\n'.join(body)
+
+    def _comment(self, comment: dict) -> dict:
+        return dict(
+            comment,
+            position=comment.get("line"),
+            commit_id=self.head_sha,
+            url=f"{self._repo_url()}/pulls/comments/{comment['id']}",
+            user={"login": "reviewer", "id": 1},
+        )
+
+    def _bare_git(self, *args: str, input: Optional[bytes] = None) -> str:
+        return subprocess.run(
+            ["git", f"--git-dir={self.bare_repo}", *args], check=True, capture_output=True, input=input,
+            text=input is None
+        ).stdout.strip()
+
+    def _write_pull_heads(self) -> str:
+        """Commit the PR files to the bare repository under every PR's head ref; return the commit SHA."""
+        stream = [b"commit refs/pull/1/head\nmark :1\ncommitter bench <bench@example.com> 0 +0000\ndata 0\n"]
+        for path, content in self.contents.items():
+            data = content.encode()
+            stream.append(b"M 100644 inline %s\ndata %d\n%s\n" % (path.encode(), len(data), data))
+        for number in range(2, self.pr_count + 1):
+            stream.append(b"reset refs/pull/%d/head\nfrom :1\n" % number)
+        self._bare_git("fast-import", "--quiet", "--force", input=b"".join(stream))
+        return self._bare_git("rev-parse", "refs/pull/1/head")
+
+    # Handlers, called with the lock held. Each returns (status, data).
+
+    def get_authenticated_user(self, query, body):
+        return self.get_user("dev-agent", query, body)
+
+    def get_user(self, login, query, body):
+        return 200, {"login": login, "id": 1, "type": "User", "url": f"{self.url}/users/{login}"}
+
+    def get_repo(self, owner, repo, query, body):
+        return 200, {
+            "id": 1, "name": repo, "full_name": f"{owner}/{repo}", "url": self._repo_url(),
+            "owner": {"login": owner, "id": 1}, "default_branch": "main", "private": False,
+        }
+
+    def get_branch(self, owner, repo, branch, query, body):
+        sha = self._bare_git("rev-parse", f"refs/heads/{branch}") if self.bare_repo else self.head_sha
+        return 200, {"name": branch, "commit": {"sha": sha, "url": f"{self._repo_url()}/commits/{sha}"}, "protected": False}
+
+    def list_pulls(self, owner, repo, query, body):
+        head = query.get("head")
+        return 200, [pull for pull in self.pulls if not head or pull["head"]["ref"] == head.split(":")[-1]]
+
+    def create_pull(self, owner, repo, query, body):
+        pull = self._pull(len(self.pulls) + 1, body["head"], body.get("title", ""))
+        self.pulls.append(pull)
+        return 201, pull
+
+    def get_pull(self, owner, repo, number, query, body):
+        return 200, self.pulls[int(number) - 1]
+
+    def list_files(self, owner, repo, number, query, body):
+        return 200, [
+            {
+                "sha": _blob_sha(self.contents[path]), "filename": path, "status": "modified",
+                "additions": 2, "deletions": 0, "changes": 2, "patch": self._patch(path),
+            }
+            for path in self.paths
+        ]
+
+    def list_comments(self, owner, repo, number, query, body):
+        return 200, [self._comment(comment) for comment in self.review_comments]
+
+    def create_comment(self, owner, repo, number, query, body):
+        comment = {"id": 5000 + len(self.created_comments), "path": body.get("path"), "line": body.get("line"), "body": body.get("body")}
+        self.created_comments.append(comment)
+        return 201, self._comment(comment)
+
+    def create_reply(self, owner, repo, number, comment_id, query, body):
+        parent = next(comment for comment in self.review_comments if comment["id"] == int(comment_id))
+        reply = {"id": 5000 + len(self.created_comments), "path": parent["path"], "line": parent["line"],
+                 "body": body.get("body"), "in_reply_to_id": parent["id"]}
+        self.created_comments.append(reply)
+        return 201, dict(self._comment(reply), user={"login": "dev-agent", "id": 2})
+
+    def create_review(self, owner, repo, number, query, body):
+        review = {"id": len(self.reviews) + 1, "state": body.get("event", "COMMENT"), "body": body.get("body", ""),
+                  "comments": len(body.get("comments") or [])}
+        self.reviews.append(review)
+        return 200, dict(review, user={"login": "dev-agent", "id": 2}, commit_id=self.head_sha)
+
+    def create_issue_comment(self, owner, repo, number, query, body):
+        return 201, {"id": 9000 + len(self.created_comments), "body": body.get("body"), "user": {"login": "dev-agent", "id": 2}}
+
+    def get_contents(self, owner, repo, path, query, body):
+        if path not in self.contents:
+            return 404, {"message": "Not Found"}
+        content = self.contents[path]
+        return 200, {
+            "type": "file", "encoding": "base64", "name": path.rsplit("/", 1)[-1], "path": path,
+            "content": base64.b64encode(content.encode()).decode(), "sha": _blob_sha(content), "size": len(content),
+            "url": f"{self._repo_url()}/contents/{path}",
+        }
+
+    def get_commit(self, owner, repo, sha, query, body):
+        return 200, {"sha": sha, "url": f"{self._repo_url()}/commits/{sha}", "commit": {"message": ""}}
+
+    def get_ref(self, owner, repo, ref, query, body):
+        if ref not in self.refs:
+            return 404, {"message": "Not Found"}
+        return 200, self._ref(ref)
+
+    def _ref(self, ref: str) -> dict:
+        sha = self.refs[ref]
+        return {
+            "ref": f"refs/{ref}", "url": f"{self._repo_url()}/git/refs/{ref}",
+            "object": {"sha": sha, "type": "commit", "url": f"{self._repo_url()}/git/commits/{sha}"},
+        }
+
+    def create_ref(self, owner, repo, query, body):
+        ref = body["ref"][len("refs/"):]
+        if ref in self.refs:
+            return 422, {"message": "Reference already exists"}
+        self.refs[ref] = body["sha"]
+        if self.bare_repo:
+            self._bare_git("update-ref", body["ref"], body["sha"])
+        return 201, self._ref(ref)
+
+    def update_ref(self, owner, repo, ref, query, body):
+        self.refs[ref] = body["sha"]
+        return 200, self._ref(ref)
+
+    def get_git_commit(self, owner, repo, sha, query, body):
+        commit = self.commits.get(sha)
+        if commit is None:
+            return 404, {"message": "Not Found"}
+        return 200, {
+            "sha": sha, "url": f"{self._repo_url()}/git/commits/{sha}", "message": "",
+            "tree": {"sha": commit["tree"], "url": f"{self._repo_url()}/git/trees/{commit['tree']}"},
+            "parents": [{"sha": parent, "url": f"{self._repo_url()}/git/commits/{parent}"} for parent in commit["parents"]],
+        }
+
+    def create_git_commit(self, owner, repo, query, body):
+        sha = _sha(json.dumps(body, sort_keys=True))
+        self.commits[sha] = {"tree": body["tree"], "parents": body.get("parents", [])}
+        return 201, {"sha": sha, "url": f"{self._repo_url()}/git/commits/{sha}", "message": body.get("message", ""),
+                     "tree": {"sha": body["tree"], "url": f"{self._repo_url()}/git/trees/{body['tree']}"}, "parents": []}
+
+    def get_tree(self, owner, repo, sha, query, body):
+        files = self.trees.get(sha)
+        if files is None:
+            return 404, {"message": "Not Found"}
+        return 200, {
+            "sha": sha, "url": f"{self._repo_url()}/git/trees/{sha}", "truncated": False,
+            "tree": [{"path": path, "mode": "100644", "type": "blob", "sha": _blob_sha(content)} for path, content in files.items()],
+        }
+
+    def get_blob(self, owner, repo, sha, query, body):
+        content = self.blobs.get(sha)
+        if content is None:
+            content = next((content for content in self.contents.values() if _blob_sha(content) == sha), None)
+        if content is None:
+            return 404, {"message": "Not Found"}
+        return 200, {
+            "sha": sha, "url": f"{self._repo_url()}/git/blobs/{sha}", "encoding": "base64",
+            "content": base64.b64encode(content.encode()).decode(), "size": len(content),
+        }
+
+    def create_blob(self, owner, repo, query, body):
+        sha = _blob_sha(body["content"])
+        self.blobs[sha] = body["content"]
+        return 201, {"sha": sha, "url": f"{self._repo_url()}/git/blobs/{sha}"}
+
+    def create_tree(self, owner, repo, query, body):
+        files = dict(self.trees.get(body.get("base_tree"), {}))
+        for element in body.get("tree", []):
+            files[element["path"]] = element["content"] if "content" in element else self.blobs[element["sha"]]
+        sha = _sha(json.dumps(files, sort_keys=True))
+        self.trees[sha] = files
+        return 201, {"sha": sha, "url": f"{self._repo_url()}/git/trees/{sha}", "tree": []}
@@ -0,0 +1,51 @@
+"""
+Startup budget benchmark for the dev-agent CLI.
+
+Measures, in fresh interpreters, how long it takes to import dev_agent.main
+and to get through CLI parsing for --help and a subcommand's --help, and
+fails if the median exceeds the configured budget.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--import-budget-ms 300] [--command-budget-ms 600]
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+def _time_run(args: list) -> float:
+    """Run a command in a fresh interpreter and return its wall time in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+def _median(args: list, runs: int) -> float:
+    return statistics.median(_time_run(args) for _ in range(runs))
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=300)
+    parser.add_argument("--command-budget-ms", type=float, default=600)
+    options = parser.parse_args()
+
+    baseline = _median(["-c", "pass"], options.runs)
+    results = [
+        ("import dev_agent.main", _median(["-c", "import dev_agent.main"], options.runs) - baseline, options.import_budget_ms),
+        ("dev-agent --help", _median(["-m", "dev_agent", "--help"], options.runs) - baseline, options.command_budget_ms),
+        ("dev-agent review --help", _median(["-m", "dev_agent", "review", "--help"], options.runs) - baseline, options.command_budget_ms),
+    ]
+
+    print(f"Interpreter baseline: {baseline:.1f} ms (subtracted below)")
+    failed = False
+    for name, elapsed, budget in results:
+        status = "ok" if elapsed <= budget else "OVER BUDGET"
+        failed = failed or elapsed > budget
+        print(f"{name:<28} {elapsed:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
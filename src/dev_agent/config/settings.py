@@ -2,10 +2,63 @@ import os
 from pathlib import Path
 from pydantic_settings import BaseSettings
 
-class Settings(BaseSettings):
+class LoggingSettings(BaseSettings):
+    """
+    The logging settings on their own. Everything has a default, so the CLI can set up
+    logging (e.g. for --help) without the credentials that Settings requires.
+    """
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    LOG_MAX_PAYLOAD_CHARS: int = 2000
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        # The .env file holds the other settings too
+        extra = "ignore"
+
+class Settings(LoggingSettings):
+    # LLM backends: "openai", "local" (an OpenAI-compatible server such as Ollama or
+    # llama.cpp) or "canned" (fixed offline responses). The per-command settings
+    # override LLM_BACKEND, e.g. to triage review comments with a local model.
+    LLM_BACKEND: str = "openai"
+    LLM_GENERATE_BACKEND: str = ""
+    LLM_REVIEW_BACKEND: str = ""
+    LLM_RESPOND_BACKEND: str = ""
+    
+    # Per-request deadline in seconds (0 disables it)
+    LLM_REQUEST_TIMEOUT: float = 120.0
+    
+    # Ordered fallback chain of "backend" or "backend:model" specs, comma separated
+    # (e.g. "openai:gpt-3.5-turbo,local"). Calls slower than the primary backend's
+    # LLM_HEDGE_PERCENTILE latency are also sent to the next backend, and failed calls
+    # fall back to it. A percentile of 0 disables hedging and keeps plain fallback.
+    LLM_FALLBACK_BACKENDS: str = ""
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_DELAY: float = 1.0
+    LLM_HEDGE_INITIAL_DELAY: float = 30.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    
+    # Local model settings
+    LOCAL_LLM_URL: str = "http://localhost:11434/v1"
+    LOCAL_LLM_MODEL: str = "llama3"
+    LOCAL_LLM_API_KEY: str = ""
+    LOCAL_LLM_MAX_CONCURRENCY: int = 2
+    
+    # Canned backend settings
+    CANNED_LLM_RESPONSES: str = ""
+    
     # OpenAI settings
-    OPENAI_API_KEY: str
+    OPENAI_API_KEY: str = ""
     DEFAULT_MODEL: str = "gpt-4"
+    OPENAI_API_BASE: str = ""
+    LLM_STREAM: bool = True
+    
+    # LLM response cache settings
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: Path = Path(os.path.expanduser("~/.cache/dev_agent/llm"))
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    LLM_CACHE_MAX_AGE: int = 7 * 24 * 60 * 60
     
     # Git settings
     GIT_DEFAULT_BRANCH: str = "main"
@@ -13,12 +66,79 @@ class Settings(BaseSettings):
     GITHUB_TOKEN: str
     GITHUB_REPO_OWNER: str
     GITHUB_REPO_NAME: str
+    GITHUB_API_URL: str = "https://api.github.com"
+    GIT_REMOTE_URL: str = ""
     GIT_AUTHOR_NAME: str = "Dev Agent"
     GIT_AUTHOR_EMAIL: str = "dev-agent@example.com"
+    GIT_FETCH_FRESHNESS_SECONDS: int = 300
+    GIT_FETCH_DEPTH: int = 0
+    GIT_FETCH_FILTER: str = ""
+    # Read pull request files from the workspace clone after one fetch of the PR head,
+    # instead of one API request per file. Partial clones (GIT_FETCH_FILTER) always use
+    # the API, since each missing blob would be fetched separately.
+    GIT_LOCAL_READS: bool = True
+    
+    # GitHub API response cache: GETs are revalidated with ETag/Last-Modified, and
+    # blobs, trees and commits fetched by SHA are served without a request
+    GITHUB_CACHE_ENABLED: bool = True
+    GITHUB_CACHE_DIR: Path = Path(os.path.expanduser("~/.cache/dev_agent/github"))
+    GITHUB_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    GITHUB_CACHE_MAX_AGE: int = 7 * 24 * 60 * 60
+    
+    # Logging settings (LOG_LEVEL, LOG_JSON, LOG_MAX_PAYLOAD_CHARS) come from LoggingSettings
+
+    # Run metrics file: JSON if it ends in .json, OpenMetrics text otherwise (empty disables it)
+    METRICS_FILE: str = ""
+    
+    # State store for handled review comments
+    STATE_ENABLED: bool = True
+    STATE_DB_PATH: Path = Path(os.path.expanduser("~/.cache/dev_agent/state.db"))
+    
+    # Webhook server settings
+    SERVE_HOST: str = "127.0.0.1"
+    SERVE_PORT: int = 8080
+    SERVE_WORKERS: int = 2
+    GITHUB_WEBHOOK_SECRET: str = ""
+    # The account the agent acts as, whose own webhook events and review comments are
+    # ignored; looked up from the token if empty (set it for tokens that can't read
+    # /user, e.g. GitHub Apps)
+    GITHUB_AGENT_LOGIN: str = ""
     
     # Workspace settings
     WORKSPACE_PATH: Path = Path(os.path.expanduser("~/agent_workspace"))
     
+    # Review settings
+    REVIEW_CONCURRENCY: int = 4
+    REVIEW_DIFF_ONLY: bool = False
+    REVIEW_DIFF_CONTEXT_LINES: int = 10
+    REVIEW_CHUNK_TOKENS: int = 4000
+    REVIEW_CHUNK_OVERLAP_LINES: int = 20
+    RESPOND_CONCURRENCY: int = 4
+    # Updated files larger than this are uploaded as blobs as soon as they are ready,
+    # instead of being held in memory until the commit
+    RESPOND_INLINE_MAX_CHARS: int = 65536
+    # Pull requests processed at once by review/respond with several branches or --all-open
+    BATCH_PR_CONCURRENCY: int = 4
+    
+    # LLM retry settings
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    
+    # LLM rate limits (0 disables a limit) and adaptive concurrency ceiling
+    LLM_REQUESTS_PER_MINUTE: int = 500
+    LLM_TOKENS_PER_MINUTE: int = 40000
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 1000
+    
+    # Token budget for one batched review comment analysis request
+    LLM_BATCH_TOKEN_BUDGET: int = 6000
+    
+    # Token budget and line window for the file context sent with review comments
+    LLM_CONTEXT_TOKEN_BUDGET: int = 3000
+    LLM_CONTEXT_WINDOW_LINES: int = 20
+    
     class Config:
         env_file = ".env"
-        env_file_encoding = "utf-8"
\ No newline at end of file
+        env_file_encoding = "utf-8"
+        # Unlike LoggingSettings, unknown settings in .env are an error
+        extra = "forbid"
\ No newline at end of file
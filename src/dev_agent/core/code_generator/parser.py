@@ -0,0 +1,73 @@
+import re
+from typing import List, Optional, Tuple
+
+FILE_HEADER = re.compile(r"^\s*=+ FILE: ?/?([\w\-/\.]+) =+\s*$")
+OPENING_FENCE = re.compile(r"^```[a-zA-Z]*$")
+
+class FileBlockParser:
+    """
+    Incrementally parse "=== FILE: path ===" blocks out of streamed LLM output.
+
+    Text is fed in arbitrary chunks; each file is returned as soon as the next
+    delimiter (or the end of the stream) closes its block, so only the block
+    currently being received is held in memory.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._path: Optional[str] = None
+        self._lines: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a chunk of output and return the (path, content) of any completed files."""
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        completed = []
+        for line in lines:
+            block = self._consume_line(line)
+            if block:
+                completed.append(block)
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Flush the remaining output at the end of the stream."""
+        completed = []
+        if self._pending:
+            block = self._consume_line(self._pending)
+            self._pending = ""
+            if block:
+                completed.append(block)
+        block = self._finish_block()
+        if block:
+            completed.append(block)
+        return completed
+
+    def _consume_line(self, line: str) -> Optional[Tuple[str, str]]:
+        match = FILE_HEADER.match(line)
+        if not match:
+            if self._path is not None:
+                self._lines.append(line)
+            return None
+
+        block = self._finish_block()
+        path = match.group(1).strip()
+        # "=== FILE: END ===" terminates the last block without opening a new one
+        self._path = None if path == "END" else path
+        return block
+
+    def _finish_block(self) -> Optional[Tuple[str, str]]:
+        if self._path is None:
+            return None
+
+        lines = self._lines
+        # Tolerate markdown fences around the file content
+        if lines and OPENING_FENCE.match(lines[0].strip()):
+            lines = lines[1:]
+        content = '\n'.join(lines).rstrip()
+        if content.endswith('```'):
+            content = content[:-3]
+
+        block = (self._path, content.strip())
+        self._path = None
+        self._lines = []
+        return block
@@ -0,0 +1,66 @@
+import os
+import hashlib
+import tempfile
+from typing import Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+def file_digest(path: str) -> Optional[str]:
+    """
+    Hash a file's content.
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        Optional[str]: The SHA-256 hex digest, or None if the file does not exist.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def write_if_changed(path: str, content: str) -> bool:
+    """
+    Write a file atomically, unless it already has exactly this content.
+
+    The content is written to a temporary file in the same directory and renamed over
+    the target, so readers never see a partially written file. An existing file keeps
+    its permissions.
+
+    Args:
+        path (str): The file to write.
+        content (str): The new content.
+
+    Returns:
+        bool: True if the file was created or changed, False if it was already identical.
+    """
+    data = content.encode('utf-8')
+    if file_digest(path) == hashlib.sha256(data).hexdigest():
+        return False
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            # mkstemp creates files as 0600; use the usual mode for new files
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
@@ -0,0 +1,98 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+def parse_patch(patch: str) -> Tuple[Dict[int, str], Set[int]]:
+    """
+    Parse a unified diff patch for a single file.
+
+    Args:
+        patch (str): The patch text as returned by the GitHub files API.
+
+    Returns:
+        Tuple[Dict[int, str], Set[int]]: The new-side lines present in the hunks,
+            keyed by their line number in the file, and the line numbers that were added.
+    """
+    new_lines = {}
+    added = set()
+    line_no = None
+
+    for raw in patch.split('\n'):
+        match = HUNK_HEADER.match(raw)
+        if match:
+            line_no = int(match.group(1))
+            continue
+        if line_no is None or raw.startswith('\\'):
+            # Text before the first hunk or "\ No newline at end of file"
+            continue
+        if raw.startswith('-'):
+            continue
+        if raw.startswith('+'):
+            added.add(line_no)
+        new_lines[line_no] = raw[1:]
+        line_no += 1
+
+    return new_lines, added
+
+def build_review_excerpt(patch: str, content: Optional[str] = None, window: int = 0) -> Tuple[str, List[int]]:
+    """
+    Build a line-numbered excerpt of the changed regions of a file.
+
+    Args:
+        patch (str): The file's unified diff patch.
+        content (Optional[str]): The full new file content, needed when window > 0.
+        window (int): Extra lines of surrounding context to include around each change.
+
+    Returns:
+        Tuple[str, List[int]]: The excerpt, with every line prefixed by its real line
+            number, and the sorted line numbers that can carry review comments.
+    """
+    new_lines, added = parse_patch(patch)
+    commentable = sorted(new_lines)
+
+    source = dict(new_lines)
+    shown = set(new_lines)
+    if content is not None and window > 0:
+        file_lines = content.split('\n')
+        for line_no in (added or shown):
+            start = max(1, line_no - window)
+            end = min(len(file_lines), line_no + window)
+            shown.update(range(start, end + 1))
+        for line_no in shown:
+            if line_no not in source and line_no <= len(file_lines):
+                source[line_no] = file_lines[line_no - 1]
+
+    excerpt = []
+    previous = None
+    for line_no in sorted(shown):
+        if line_no not in source:
+            continue
+        if previous is not None and line_no != previous + 1:
+            excerpt.append("   ...")
+        marker = '+' if line_no in added else ' '
+        excerpt.append(f"{line_no:>6}{marker} {source[line_no]}")
+        previous = line_no
+
+    return '\n'.join(excerpt), commentable
+
+def snap_to_line(line: int, commentable: List[int], max_distance: int = 3) -> Optional[int]:
+    """
+    Return the commentable line closest to the given line.
+
+    Args:
+        line (int): The line an issue was reported on.
+        commentable (List[int]): The sorted lines that can carry review comments.
+        max_distance (int): How many lines away the closest line may be.
+
+    Returns:
+        Optional[int]: The closest commentable line, or None if there is none within
+            max_distance, so the issue is not anchored on unrelated code.
+    """
+    if not commentable:
+        return None
+    index = bisect_left(commentable, line)
+    candidates = commentable[max(0, index - 1):index + 1]
+    closest = min(candidates, key=lambda candidate: abs(candidate - line))
+    return closest if abs(closest - line) <= max_distance else None
@@ -1,208 +1,518 @@
 import os
+import json
+import base64
+import threading
+import time
 from pathlib import Path
-from git import Repo
+from typing import Dict, Iterator, List, Optional, Tuple
+from functools import cached_property
+from git import GitCommandError, Repo
 from github import Github
 from ...config.settings import Settings
 from github.Repository import Repository
+from github.PaginatedList import PaginatedList
+from github.InputGitAuthor import InputGitAuthor
+from github.InputGitTreeElement import InputGitTreeElement
 from github.GithubException import GithubException
+from ...utils.log import get_logger, Payload
+from ...utils.metrics import METRICS, span
+from .http import install_github_transport
+from ..llm.cache import ResponseCache
+
+logger = get_logger(__name__)
 
 class GitManager:
     def __init__(self, settings: Settings):
-        print("\n=== Debug: GitHub Environment Values ===")
-        print(f"GITHUB_TOKEN: {settings.GITHUB_TOKEN[:10]}...")  # Only show first 10 chars for security
-        print(f"GITHUB_REPO_OWNER: {settings.GITHUB_REPO_OWNER}")
-        print(f"GITHUB_REPO_NAME: {settings.GITHUB_REPO_NAME}")
-        print("======================================\n")
+        logger.debug(
+            "GitHub repository %s/%s (token %s...)",
+            settings.GITHUB_REPO_OWNER, settings.GITHUB_REPO_NAME,
+            settings.GITHUB_TOKEN[:4]  # Only show the first chars for security
+        )
         
         self.settings = settings
-        self.github = Github(settings.GITHUB_TOKEN)
-        self.repo = self.github.get_user(settings.GITHUB_REPO_OWNER).get_repo(settings.GITHUB_REPO_NAME)
+        install_github_transport(ResponseCache(
+            settings.GITHUB_CACHE_DIR,
+            max_bytes=settings.GITHUB_CACHE_MAX_BYTES,
+            max_age=settings.GITHUB_CACHE_MAX_AGE,
+            enabled=settings.GITHUB_CACHE_ENABLED
+        ))
+        # 100 is the largest page size GitHub allows, so long listings take the fewest requests
+        self.github = Github(settings.GITHUB_TOKEN, base_url=settings.GITHUB_API_URL, per_page=100)
         self.workspace_path = Path(os.path.expanduser(settings.WORKSPACE_PATH))
         self.default_branch = settings.GIT_DEFAULT_BRANCH
-        
-        # Initialize local repository
-        self._init_local_repo()
+        # Set once a pull request head has been fetched, so read_file tries the clone first
+        self.local_reads = False
+        # Concurrent fetches would contend for the same ref locks, and GitPython's
+        # persistent cat-file process serves one reader at a time
+        self._fetch_lock = threading.Lock()
+        self._cat_file_lock = threading.Lock()
+
+    @cached_property
+    def repo(self) -> Repository:
+        """The GitHub repository, looked up on first use."""
+        return self.github.get_user(self.settings.GITHUB_REPO_OWNER).get_repo(self.settings.GITHUB_REPO_NAME)
+
+    @cached_property
+    def agent_login(self) -> str:
+        """The login the agent acts as: GITHUB_AGENT_LOGIN, else the token's user, or "" if unknown."""
+        if self.settings.GITHUB_AGENT_LOGIN:
+            return self.settings.GITHUB_AGENT_LOGIN
+        try:
+            return self.github.get_user().login
+        except Exception as e:
+            logger.warning("Could not look up the agent's login, so its own events and comments are not ignored: %s", e)
+            return ""
 
-    def _init_local_repo(self):
+    @cached_property
+    def local_repo(self) -> Repo:
+        """The local workspace repository, initialized and fetched on first use."""
+        return self._init_local_repo()
+
+    def _init_local_repo(self) -> Repo:
         """Initialize and set up the local Git repository."""
-        print("\n=== Debug: Initializing Local Git Repository ===")
-        print(f"Workspace path: {self.workspace_path}")
+        logger.debug("Initializing local git repository at %s", self.workspace_path)
         
         try:
             if not (self.workspace_path / '.git').exists():
-                print("Initializing new git repository")
+                logger.info("Initializing new git repository at %s", self.workspace_path)
                 repo = Repo.init(self.workspace_path)
             else:
-                print("Git repository already initialized")
                 repo = Repo(self.workspace_path)
             
             # Set up remote with authentication
-            remote_url = f"https://{self.settings.GITHUB_TOKEN}@github.com/{self.settings.GITHUB_REPO_OWNER}/{self.settings.GITHUB_REPO_NAME}.git"
-            print(f"Setting up remote origin with authentication")
-            
+            remote_url = self.settings.GIT_REMOTE_URL or f"https://{self.settings.GITHUB_TOKEN}@github.com/{self.settings.GITHUB_REPO_OWNER}/{self.settings.GITHUB_REPO_NAME}.git"
             try:
                 origin = repo.remote('origin')
                 origin.set_url(remote_url)
-                print("Updated remote URL with authentication")
+                logger.debug("Updated remote URL with authentication")
             except ValueError:
                 origin = repo.create_remote('origin', remote_url)
-                print("Created new remote origin")
+                logger.debug("Created new remote origin")
             
-            # Fetch from remote to set up tracking
-            print("Fetching from remote")
-            origin.fetch()
-            print("======================================\n")
+            # Partial clone: let git lazily fetch filtered-out objects from origin
+            if self.settings.GIT_FETCH_FILTER:
+                with repo.config_writer() as config:
+                    config.set_value('remote "origin"', "promisor", "true")
+                    config.set_value('remote "origin"', "partialclonefilter", self.settings.GIT_FETCH_FILTER)
             
-            self.local_repo = repo
+            # Fetch only the default branch to set up tracking
+            self._fetch(repo, [self.default_branch])
+            
+            return repo
         except Exception as e:
-            print(f"Error initializing repository: {str(e)}")
+            logger.error("Error initializing repository: %s", e)
             raise
 
+    def _fetch(self, repo: Repo, branches: list):
+        """
+        Fetch only the given branches from origin.
+
+        Branches fetched within GIT_FETCH_FRESHNESS_SECONDS are skipped.
+        """
+        stamp_path = Path(repo.git_dir) / "dev_agent_fetch.json"
+        try:
+            with open(stamp_path, "r") as f:
+                stamps = json.load(f)
+        except (OSError, ValueError):
+            stamps = {}
+
+        now = time.time()
+        window = self.settings.GIT_FETCH_FRESHNESS_SECONDS
+        stale = [
+            branch for branch in branches
+            if now - stamps.get(branch, 0) > window
+        ]
+        if not stale:
+            logger.debug("Skipping fetch, refs fetched within the last %ss: %s", window, ", ".join(branches))
+            return
+
+        options = {}
+        if self.settings.GIT_FETCH_DEPTH:
+            options["depth"] = self.settings.GIT_FETCH_DEPTH
+        if self.settings.GIT_FETCH_FILTER:
+            options["filter"] = self.settings.GIT_FETCH_FILTER
+
+        refspecs = [f"+refs/heads/{branch}:refs/remotes/origin/{branch}" for branch in stale]
+        logger.info("Fetching refs: %s", ", ".join(stale))
+        with span("git.fetch"):
+            repo.remote('origin').fetch(refspecs, **options)
+
+        for branch in stale:
+            stamps[branch] = now
+        try:
+            with open(stamp_path, "w") as f:
+                json.dump(stamps, f)
+        except OSError as e:
+            logger.warning("Failed to record fetch time: %s", e)
+
     def create_feature_branch(self, branch_name: str) -> str:
         """Create and checkout a new feature branch."""
-        print(f"\n=== Debug: Creating feature branch ===")
-        print(f"Branch name: {branch_name}")
-        
         # Remove feature/ prefix if it's already in the branch name
         if branch_name.startswith(f"{self.settings.GIT_FEATURE_BRANCH_PREFIX}/"):
             branch_name = branch_name[len(f"{self.settings.GIT_FEATURE_BRANCH_PREFIX}/"):]
         
         full_branch_name = f"{self.settings.GIT_FEATURE_BRANCH_PREFIX}/{branch_name}"
-        print(f"Full branch name: {full_branch_name}")
+        logger.debug("Creating feature branch %s", full_branch_name)
         
         try:
             # Create branch in GitHub
-            print(f"Getting default branch: {self.settings.GIT_DEFAULT_BRANCH}")
             default_branch = self.repo.get_branch(self.settings.GIT_DEFAULT_BRANCH)
-            print(f"Default branch SHA: {default_branch.commit.sha}")
+            logger.debug("Default branch %s is at %s", self.settings.GIT_DEFAULT_BRANCH, default_branch.commit.sha)
             
-            print(f"Creating new branch: {full_branch_name}")
             try:
                 self.repo.create_git_ref(
                     ref=f"refs/heads/{full_branch_name}",
                     sha=default_branch.commit.sha
                 )
-                print("Branch created successfully in GitHub")
+                logger.info("Created branch %s in GitHub", full_branch_name)
             except GithubException as e:
                 if e.status == 422 and "Reference already exists" in str(e):
-                    print("Branch already exists in GitHub")
+                    logger.info("Branch %s already exists in GitHub", full_branch_name)
                 else:
                     raise
             
+            # Fetch the feature branch so it is tracked locally
+            repo = self.local_repo
+            self._fetch(repo, [full_branch_name])
+            
             # Checkout branch locally
-            print("Checking out branch locally")
-            repo = Repo(self.workspace_path)
             repo.git.checkout('-B', full_branch_name)
-            print("Branch checked out locally")
-            print("======================================\n")
+            logger.debug("Checked out %s locally", full_branch_name)
             
             return full_branch_name
         except Exception as e:
-            print(f"Error in branch operations: {str(e)}")
-            print("======================================\n")
+            logger.error("Error in branch operations: %s", e)
             raise
 
-    def commit_changes(self, message: str):
-        """Commit all changes in the workspace."""
-        print("\n=== Debug: Committing changes ===")
-        print(f"Commit message: {message}")
-        print(f"Workspace path: {self.workspace_path}")
-        print(f"Author: {self.settings.GIT_AUTHOR_NAME} <{self.settings.GIT_AUTHOR_EMAIL}>")
+    def commit_changes(self, message: str, paths: Optional[List[str]] = None) -> bool:
+        """
+        Commit changes in the workspace.
+
+        Args:
+            message (str): The commit message.
+            paths (Optional[List[str]]): Stage only these workspace-relative paths
+                instead of every change in the workspace.
+
+        Returns:
+            bool: True if a commit was made, False if nothing was staged.
+        """
+        logger.debug("Committing changes in %s: %s", self.workspace_path, message)
         
         try:
-            repo = Repo(self.workspace_path)
-            print(f"Current branch: {repo.active_branch.name}")
+            repo = self.local_repo
+            
+            with span("git.add"):
+                if paths is None:
+                    # Add all changes
+                    repo.git.add('--all')
+                else:
+                    # Stage in batches to stay under the command line length limit
+                    for start in range(0, len(paths), 100):
+                        batch = self._drop_ignored(repo, paths[start:start + 100])
+                        if batch:
+                            repo.git.add('--', *batch)
             
-            # Add all changes
-            print("Adding all changes to staging")
-            repo.git.add('--all')
+            # Nothing to commit if the index matches HEAD
+            if repo.head.is_valid():
+                staged = repo.is_dirty(index=True, working_tree=False)
+            else:
+                staged = bool(repo.index.entries)
+            if not staged:
+                logger.info("Nothing to commit on %s", repo.active_branch.name)
+                return False
             
             # Commit changes with author information
-            print("Creating commit")
-            repo.git.commit(
-                '-m', message,
-                author=f"{self.settings.GIT_AUTHOR_NAME} <{self.settings.GIT_AUTHOR_EMAIL}>"
-            )
-            print("Commit created successfully")
-            print("======================================\n")
+            with span("git.commit"):
+                repo.git.commit(
+                    '-m', message,
+                    author=f"{self.settings.GIT_AUTHOR_NAME} <{self.settings.GIT_AUTHOR_EMAIL}>"
+                )
+            logger.info("Committed changes on %s", repo.active_branch.name)
+            return True
         except Exception as e:
-            print(f"Error committing changes: {str(e)}")
-            print("======================================\n")
+            logger.error("Error committing changes: %s", e)
             raise
 
+    @staticmethod
+    def _drop_ignored(repo: Repo, paths: List[str]) -> List[str]:
+        """
+        Drop the gitignored paths, which `git add` refuses to stage.
+
+        Edits can touch generated or local files such as .env; those stay in the
+        workspace but are left out of the commit. Tracked files are never reported
+        as ignored, so edits to them are kept.
+        """
+        # check-ignore exits with 1 when none of the paths are ignored
+        status, stdout, stderr = repo.git.check_ignore(
+            '--', *paths, with_extended_output=True, with_exceptions=False
+        )
+        if status not in (0, 1):
+            raise GitCommandError(['git', 'check-ignore'], status, stderr)
+        ignored = set(stdout.splitlines())
+        if ignored:
+            logger.info("Not committing ignored paths: %s", ", ".join(sorted(ignored)))
+        return [path for path in paths if path not in ignored]
+
     def push_changes(self, branch: str):
         """Push changes to the remote repository."""
-        print("\n=== Debug: Pushing changes ===")
-        print(f"Branch: {branch}")
-        print(f"Workspace path: {self.workspace_path}")
+        logger.debug("Pushing %s from %s", branch, self.workspace_path)
         
         try:
-            repo = Repo(self.workspace_path)
-            print(f"Current branch: {repo.active_branch.name}")
+            repo = self.local_repo
             
             # Try to pull changes first
-            print("Attempting to pull latest changes")
             try:
                 repo.git.pull('origin', branch, '--rebase')
-                print("Successfully pulled changes")
+                logger.debug("Pulled latest changes for %s", branch)
             except Exception as e:
                 if "couldn't find remote ref" in str(e):
-                    print("Remote branch doesn't exist yet, skipping pull")
+                    logger.debug("Remote branch doesn't exist yet, skipping pull")
                 else:
-                    print(f"Warning: Failed to pull changes: {str(e)}")
+                    logger.warning("Failed to pull changes: %s", e)
             
             # Set upstream and push
-            print("Setting upstream branch and pushing")
-            repo.git.push('--set-upstream', 'origin', branch, '--force')
-            print("Changes pushed successfully")
-            print("======================================\n")
+            with span("git.push"):
+                repo.git.push('--set-upstream', 'origin', branch, '--force')
+            logger.info("Pushed changes to %s", branch)
         except Exception as e:
-            print(f"Error pushing changes: {str(e)}")
-            print("======================================\n")
+            logger.error("Error pushing changes: %s", e)
             raise
 
     def create_merge_request(self, branch: str, title: str, description: str) -> str:
         """Create a merge request for the given branch."""
-        print("\n=== Debug: Creating merge request ===")
-        print(f"Branch: {branch}")
-        print(f"Title: {title}")
-        print(f"Description: {description}")
+        logger.debug("Creating merge request for %s: %s", branch, title)
         
         try:
-            print("Creating pull request")
             pr = self.repo.create_pull(
                 title=title,
                 body=description,
                 head=branch,
                 base=self.settings.GIT_DEFAULT_BRANCH
             )
-            print(f"Pull request created successfully: {pr.html_url}")
-            print("======================================\n")
+            logger.info("Created pull request %s", pr.html_url)
             return pr.html_url
         except GithubException as e:
             if e.status == 422 and "A pull request already exists" in str(e):
-                print("Pull request already exists, getting existing PR")
                 prs = self.repo.get_pulls(state='open', head=branch)
                 if prs.totalCount > 0:
-                    print(f"Found existing PR: {prs[0].html_url}")
-                    print("======================================\n")
+                    logger.info("Pull request already exists: %s", prs[0].html_url)
                     return prs[0].html_url
-            print(f"Error creating pull request: {str(e)}")
-            print("======================================\n")
+            logger.error("Error creating pull request: %s", e)
+            raise
+
+    def iterate_pages(self, items: PaginatedList) -> Iterator:
+        """
+        Iterate over a paginated listing one page at a time.
+
+        Iterating a PaginatedList directly keeps every element it has returned, so
+        memory grows with the listing; this keeps only the current page.
+        """
+        per_page = self.github.per_page
+        page = 0
+        while True:
+            elements = items.get_page(page)
+            yield from elements
+            if len(elements) < per_page:
+                return
+            page += 1
+
+    def fetch_pull_request(self, number: int, head_sha: str) -> bool:
+        """
+        Make a pull request's head commit and its files available in the workspace clone.
+
+        Fetches refs/pull/<number>/head, which also covers pull requests from forks,
+        unless the commit is already present. Once this succeeds, read_file reads blobs
+        from the clone. Failures are logged and leave reads on the API.
+
+        Returns:
+            bool: True if the head commit is available locally.
+        """
+        if not self.settings.GIT_LOCAL_READS or self.settings.GIT_FETCH_FILTER:
+            return False
+        try:
+            with self._fetch_lock:
+                repo = self.local_repo
+                if not self._has_object(repo, f"{head_sha}^{{commit}}"):
+                    options = {"depth": self.settings.GIT_FETCH_DEPTH} if self.settings.GIT_FETCH_DEPTH else {}
+                    logger.info("Fetching pull request #%s head %s", number, head_sha[:12])
+                    with span("git.fetch"):
+                        repo.remote('origin').fetch(
+                            f"+refs/pull/{number}/head:refs/remotes/origin/pull/{number}", **options
+                        )
+                    if not self._has_object(repo, f"{head_sha}^{{commit}}"):
+                        logger.warning("Pull request #%s head %s is not on origin yet", number, head_sha[:12])
+                        return False
+            self.local_reads = True
+            return True
+        except Exception as e:
+            logger.warning("Could not fetch pull request #%s, reading files through the API: %s", number, e)
+            return False
+
+    @staticmethod
+    def _has_object(repo: Repo, name: str) -> bool:
+        try:
+            repo.git.cat_file('-e', name)
+            return True
+        except GitCommandError:
+            return False
+
+    def _read_local_blob(self, blob_sha: str) -> Optional[bytes]:
+        """Read a blob from the clone's object database, or return None if it is not there."""
+        try:
+            with self._cat_file_lock:
+                _, kind, _, data = self.local_repo.git.get_object_data(blob_sha)
+        except ValueError:
+            return None
+        return data if kind == b"blob" else None
+
+    def read_file(self, path: str, ref: str, blob_sha: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Read a file from the repository.
+
+        Args:
+            path (str): The file path.
+            ref (str): The branch or commit to read the file at, if blob_sha is not known.
+            blob_sha (Optional[str]): The file's blob SHA, e.g. from a pull request's file
+                listing. After fetch_pull_request the blob is read from the clone; otherwise
+                it is fetched from the API, where blobs are immutable, so they are served
+                from the response cache after the first fetch. Neither is limited to 1 MB
+                like the contents API.
+
+        Returns:
+            Tuple[str, str]: The decoded file content and its blob SHA.
+        """
+        if blob_sha and self.local_reads:
+            data = self._read_local_blob(blob_sha)
+            if data is not None:
+                METRICS.increment("file_reads", source="local")
+                return data.decode(), blob_sha
+        METRICS.increment("file_reads", source="api")
+        if blob_sha:
+            blob = self.repo.get_git_blob(blob_sha)
+            return base64.b64decode(blob.content).decode(), blob_sha
+        contents = self.repo.get_contents(path, ref=ref)
+        return contents.decoded_content.decode(), contents.sha
+
+    def create_blob(self, content: str) -> str:
+        """Upload file content as a blob and return its SHA, for use with commit_files."""
+        return self.repo.create_git_blob(content, "utf-8").sha
+
+    def _file_modes(self, commit_sha: str, tree_sha: str, paths: List[str]) -> Dict[str, str]:
+        """
+        Look up the modes of the given paths in a commit, for the paths that exist.
+
+        Uses the workspace clone if it has the commit. Otherwise only the trees of the
+        directories on the way to the paths are fetched, rather than the whole
+        recursive tree, which GitHub truncates on large repositories.
+        """
+        if self.local_reads:
+            try:
+                output = self.local_repo.git.ls_tree('-z', commit_sha, '--', *paths)
+                modes = {}
+                for entry in filter(None, output.split('\0')):
+                    info, path = entry.split('\t', 1)
+                    modes[path] = info.split()[0]
+                return modes
+            except GitCommandError as e:
+                logger.debug("Commit %s is not in the workspace clone: %s", commit_sha[:12], e)
+
+        listings = {}
+
+        def listing(directory: str) -> dict:
+            if directory not in listings:
+                if not directory:
+                    sha = tree_sha
+                else:
+                    parent, _, name = directory.rpartition('/')
+                    element = listing(parent).get(name)
+                    sha = element.sha if element is not None and element.type == "tree" else None
+                listings[directory] = {} if sha is None else {
+                    element.path: element for element in self.repo.get_git_tree(sha).tree
+                }
+            return listings[directory]
+
+        modes = {}
+        for path in paths:
+            directory, _, name = path.rpartition('/')
+            element = listing(directory).get(name)
+            if element is not None:
+                modes[path] = element.mode
+        return modes
+
+    def commit_files(
+        self,
+        branch: str,
+        files: Dict[str, str],
+        message: str,
+        blobs: Optional[Dict[str, str]] = None,
+        base_sha: Optional[str] = None
+    ) -> str:
+        """
+        Commit several file updates to a remote branch as a single commit.
+
+        Builds one tree with all changed blobs on top of the base commit, creates one
+        commit and fast-forwards the branch ref to it. If the branch no longer points at
+        the base commit, e.g. because someone pushed after the files were read, nothing
+        is committed and an error is raised, so their changes are never reverted.
+
+        Args:
+            branch (str): The branch to commit to.
+            files (Dict[str, str]): New contents by path, sent inline with the tree.
+            message (str): The commit message.
+            blobs (Optional[Dict[str, str]]): Blob SHAs by path for files already
+                uploaded with create_blob.
+            base_sha (Optional[str]): The commit the files were read at. Defaults to
+                the branch head.
+
+        Returns:
+            str: The SHA of the new commit.
+        """
+        blobs = blobs or {}
+        logger.debug("Committing %d files to %s via Git Data API: %s", len(files) + len(blobs), branch, message)
+        
+        try:
+            ref = self.repo.get_git_ref(f"heads/{branch}")
+            base_sha = base_sha or ref.object.sha
+            if ref.object.sha != base_sha:
+                raise RuntimeError(
+                    f"Branch {branch} moved from {base_sha[:12]} to {ref.object.sha[:12]} since its files were read"
+                )
+            base_commit = self.repo.get_git_commit(base_sha)
+            
+            # Keep the existing file modes (e.g. executables) of the touched paths
+            modes = self._file_modes(base_sha, base_commit.tree.sha, list(files) + list(blobs))
+            
+            elements = [
+                InputGitTreeElement(path, modes.get(path, "100644"), "blob", content=content)
+                for path, content in files.items()
+            ] + [
+                InputGitTreeElement(path, modes.get(path, "100644"), "blob", sha=sha)
+                for path, sha in blobs.items()
+            ]
+            tree = self.repo.create_git_tree(elements, base_commit.tree)
+            author = InputGitAuthor(self.settings.GIT_AUTHOR_NAME, self.settings.GIT_AUTHOR_EMAIL)
+            commit = self.repo.create_git_commit(message, tree, [base_commit], author=author)
+            try:
+                # Not forced: GitHub rejects the update unless it fast-forwards the branch
+                ref.edit(commit.sha, force=False)
+            except GithubException as e:
+                if e.status != 422:
+                    raise
+                raise RuntimeError(f"Branch {branch} moved past {base_sha[:12]} while committing") from e
+            logger.info("Committed %d files to %s as %s", len(elements), branch, commit.sha)
+            return commit.sha
+        except Exception as e:
+            logger.error("Error committing files: %s", e)
             raise
 
     def respond_to_comment(self, comment, response: str):
         """Respond to a review comment."""
-        print("\n=== Debug: Responding to Comment ===")
-        print(f"Comment ID: {comment.id}")
-        print(f"Response: {response}")
+        logger.debug("Responding to comment %s: %s", comment.id, Payload(response))
         
         try:
             # Create a reply to the comment
             comment.create_review_comment_reply(response)
-            print("Response posted successfully")
-            print("======================================\n")
+            logger.info("Responded to comment %s", comment.id)
         except Exception as e:
-            print(f"Error responding to comment: {str(e)}")
-            print("======================================\n")
+            logger.error("Error responding to comment: %s", e)
             raise
\ No newline at end of file
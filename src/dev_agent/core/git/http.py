@@ -0,0 +1,111 @@
+import re
+import json
+import hashlib
+import threading
+from typing import Dict, Optional
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, RequestsResponse
+from ..llm.cache import ResponseCache
+from ...utils.metrics import METRICS
+
+# Git objects addressed by SHA never change, so cached copies are served without a request
+IMMUTABLE_PATH = re.compile(r"/git/(blobs|trees|commits)/[0-9a-f]{40}(\?|$)")
+
+# PyGithub shares one connection object between threads and passes the request to it
+# in two calls, request() then getresponse(), so the pending request is kept per thread
+_pending = threading.local()
+_cache: Optional[ResponseCache] = None
+
+class CachedResponse:
+    """A response served from the cache, shaped like the ones PyGithub reads from its connection."""
+
+    def __init__(self, headers: Dict[str, str], text: str):
+        self.status = 200
+        self.headers = headers
+        self.text = text
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+def _cache_key(url: str, headers: Dict[str, str]) -> str:
+    """Key a GET by URL and the request headers GitHub varies responses on."""
+    vary = {name.lower(): value for name, value in headers.items() if name.lower() in ("accept", "authorization")}
+    return hashlib.sha256(json.dumps([url, vary], sort_keys=True).encode("utf-8")).hexdigest()
+
+def _request(self, verb: str, url: str, input, headers: Dict[str, str]):
+    _pending.request = (verb, url, input, headers)
+
+def _getresponse(self):
+    """
+    Send the pending request, counting it in the run metrics.
+
+    With a cache installed, GETs send the stored ETag or Last-Modified validators and a
+    304 Not Modified answer (which does not count against the primary rate limit) is
+    served from the stored copy.
+    """
+    verb, url, input, headers = _pending.request
+    cache = _cache if verb == "GET" else None
+    key = entry = None
+    if cache is not None:
+        key = _cache_key(url, headers)
+        stored = cache.get(key)
+        entry = json.loads(stored) if stored else None
+    if entry is not None:
+        if IMMUTABLE_PATH.search(url):
+            METRICS.increment("github_cache", result="immutable")
+            return CachedResponse(entry["headers"], entry["body"])
+        headers = dict(headers)
+        if entry["headers"].get("etag"):
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+    with METRICS.span("github.api_call"):
+        response = getattr(self.session, verb.lower())(
+            f"{self.protocol}://{self.host}:{self.port}{url}",
+            headers=headers,
+            data=input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+    METRICS.increment("github_api_calls", method=verb, status=str(response.status_code))
+    remaining = response.headers.get("x-ratelimit-remaining")
+    if remaining is not None:
+        METRICS.set_gauge(
+            "github_rate_limit_remaining", int(remaining),
+            resource=response.headers.get("x-ratelimit-resource", "core")
+        )
+
+    if cache is None:
+        return RequestsResponse(response)
+    if entry is not None and response.status_code == 304:
+        METRICS.increment("github_cache", result="not_modified")
+        # Fresh headers (rate limit, validators) over the stored ones (pagination links)
+        fresh = {name.lower(): value for name, value in response.headers.items()}
+        return CachedResponse(dict(entry["headers"], **fresh), entry["body"])
+
+    METRICS.increment("github_cache", result="miss")
+    result = RequestsResponse(response)
+    stored_headers = {name.lower(): value for name, value in response.headers.items()}
+    if response.status_code == 200 and (
+        "etag" in stored_headers or "last-modified" in stored_headers or IMMUTABLE_PATH.search(url)
+    ):
+        cache.set(key, json.dumps({"headers": stored_headers, "body": result.text}))
+    return result
+
+def install_github_transport(cache: Optional[ResponseCache] = None):
+    """
+    Route all PyGithub API calls through the instrumented, optionally caching transport.
+
+    Requester.injectConnectionClasses would also work, but it turns off connection
+    reuse, so the connection classes' request and getresponse are replaced in place.
+    Safe to call more than once; the last cache given is used.
+    """
+    global _cache
+    _cache = cache if cache is not None and cache.enabled else None
+    for connection_class in (HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass):
+        connection_class.request = _request
+        connection_class.getresponse = _getresponse
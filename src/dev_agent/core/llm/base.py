@@ -1,10 +1,72 @@
+import json
+import asyncio
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """
+    Parse a JSON object from a model response, tolerating markdown fences around it.
+
+    Args:
+        text (str): The response text.
+
+    Returns:
+        Optional[dict]: The parsed object, or None if the response is not a JSON object.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[-1]
+    if text.endswith('```'):
+        text = text[:-3]
+    try:
+        # strict=False tolerates raw newlines inside strings, e.g. in suggested code
+        parsed = json.loads(text, strict=False)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+class LLMAccountError(Exception):
+    """The provider rejected the account (bad API key, exhausted quota, inactive billing); retrying cannot help."""
 
 class LLMInterface(ABC):
+    """Operations the agent needs from an LLM backend."""
+
     @abstractmethod
     async def generate_code(self, prompt: str) -> str:
         pass
 
+    async def generate_code_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Generate code, yielding the response text as it arrives (all at once unless overridden)."""
+        yield await self.generate_code(prompt)
+
+    @abstractmethod
+    async def review_code(self, code: str, file_path: Optional[str] = None) -> str:
+        """Review a whole file and return a JSON string with issues, summary and has_issues."""
+        pass
+
+    @abstractmethod
+    async def review_diff(self, file_path: str, excerpt: str) -> str:
+        """Review a line-numbered excerpt of a changed file, with the same JSON shape as review_code."""
+        pass
+
     @abstractmethod
-    async def review_code(self, code: str) -> str:
-        pass
\ No newline at end of file
+    async def analyze_review_comment(self, code: str, comment: str, line_number: int, file_path: Optional[str] = None) -> Optional[dict]:
+        """Return change_needed, suggested_change and response for one review comment, or None if the answer is unusable."""
+        pass
+
+    async def analyze_review_comments(self, code: str, comments: List[dict], file_path: Optional[str] = None) -> Dict[int, Optional[dict]]:
+        """
+        Analyze several review comments on one file, keyed by comment ID (None where the answer is unusable).
+
+        Backends that can answer for all comments in one request should override this;
+        the default analyzes the comments one by one, concurrently.
+        """
+        results = await asyncio.gather(*(
+            self.analyze_review_comment(code, comment["body"], comment["line"], file_path)
+            for comment in comments
+        ))
+        return {comment["id"]: result for comment, result in zip(comments, results)}
+
+    def metrics(self) -> dict:
+        """Return counters for this process, such as cache hits and rate limiter waits."""
+        return {}
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class ResponseCache:
+    """Persistent, content-addressed cache of LLM responses."""
+
+    EVICT_EVERY = 32
+
+    def __init__(self, cache_dir: Path, max_bytes: int, max_age: int, enabled: bool = True):
+        self.cache_dir = Path(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list, **params) -> str:
+        """Hash the model, messages and request parameters into a cache key."""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if self.max_age and time.time() - entry.get("created", 0) > self.max_age:
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # Touch the entry so size-based eviction drops the least recently used first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry.get("response")
+
+    def set(self, key: str, response: str):
+        """Store a response and evict old entries if the cache is over budget."""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "response": response}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write LLM cache entry: %s", e)
+            return
+
+        # Scanning the cache directory is not free, so only do it periodically
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until under max_bytes."""
+        if not self.cache_dir.exists():
+            return
+
+        now = time.time()
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self.max_age and now - stat.st_mtime > self.max_age:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for this process."""
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,48 @@
+import json
+from typing import Optional
+from .base import LLMInterface
+from ...config.settings import Settings
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class CannedLLM(LLMInterface):
+    """
+    Deterministic offline backend that returns fixed responses without calling a model.
+
+    Useful for dry runs, demos and pipelines without network access. The defaults
+    report no issues and make no changes; CANNED_LLM_RESPONSES can point to a JSON file
+    with "generate", "review" and "analysis" entries to override them.
+    """
+
+    DEFAULTS = {
+        "generate": "=== FILE: GENERATED.md ===\nGenerated offline for: {prompt}\n",
+        "review": {"issues": [], "summary": "No issues found (offline backend).", "has_issues": False},
+        "analysis": {"change_needed": False, "suggested_change": "", "response": "Acknowledged (offline backend)."},
+    }
+
+    def __init__(self, settings: Settings):
+        self.responses = dict(self.DEFAULTS)
+        if settings.CANNED_LLM_RESPONSES:
+            with open(settings.CANNED_LLM_RESPONSES, "r", encoding="utf-8") as f:
+                self.responses.update(json.load(f))
+        self.calls = 0
+
+    async def generate_code(self, prompt: str) -> str:
+        self.calls += 1
+        return self.responses["generate"].replace("{prompt}", prompt)
+
+    async def review_code(self, code: str, file_path: Optional[str] = None) -> str:
+        self.calls += 1
+        return json.dumps(self.responses["review"])
+
+    async def review_diff(self, file_path: str, excerpt: str) -> str:
+        self.calls += 1
+        return json.dumps(self.responses["review"])
+
+    async def analyze_review_comment(self, code: str, comment: str, line_number: int, file_path: Optional[str] = None) -> dict:
+        self.calls += 1
+        return dict(self.responses["analysis"])
+
+    def metrics(self) -> dict:
+        return {"model": "canned", "calls": self.calls}
@@ -0,0 +1,72 @@
+import ast
+from typing import List, Optional, Set, Tuple
+from .tokens import estimate_tokens
+
+def _chunk_boundaries(code: str, lines: List[str], file_path: Optional[str]) -> Set[int]:
+    """Return the 1-based line numbers where a chunk may start."""
+    boundaries = {1}
+    if file_path is None or file_path.endswith(".py"):
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            tree = None
+        if tree is not None:
+            # Top-level statements, plus the members of top-level classes
+            nodes = list(tree.body)
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef):
+                    nodes.extend(node.body)
+            for node in nodes:
+                decorators = getattr(node, "decorator_list", [])
+                boundaries.add(min([node.lineno] + [decorator.lineno for decorator in decorators]))
+            return boundaries
+
+    # Other files: start chunks after blank lines
+    for index in range(1, len(lines)):
+        if not lines[index - 1].strip() and lines[index].strip():
+            boundaries.add(index + 1)
+    return boundaries
+
+def split_code_into_chunks(code: str, max_tokens: int, overlap_lines: int = 0, file_path: Optional[str] = None) -> List[Tuple[int, str]]:
+    """
+    Split source code into overlapping chunks on syntactic boundaries.
+
+    Chunks end just before a top-level definition (Python, via the AST) or a blank-line
+    separated block, and only fall back to a hard cut when a single block is larger
+    than max_tokens. Each chunk after the first repeats the last overlap_lines lines of
+    the previous one.
+
+    Args:
+        code (str): The full file content.
+        max_tokens (int): Approximate maximum tokens per chunk.
+        overlap_lines (int): Lines shared between consecutive chunks.
+        file_path (Optional[str]): The file name, used to detect Python sources.
+
+    Returns:
+        List[Tuple[int, str]]: The 1-based starting line of each chunk and its text.
+    """
+    lines = code.split('\n')
+    total = len(lines)
+    boundaries = _chunk_boundaries(code, lines, file_path)
+    costs = [estimate_tokens(line) + 1 for line in lines]
+
+    chunks = []
+    start = 1
+    while start <= total:
+        used = 0
+        end = start
+        # Take lines until the budget is exhausted (always at least one line)
+        while end <= total and (end == start or used + costs[end - 1] <= max_tokens):
+            used += costs[end - 1]
+            end += 1
+        if end > total:
+            chunks.append((start, '\n'.join(lines[start - 1:])))
+            break
+
+        # Cut before the last boundary inside the chunk, if there is one
+        cut = max((boundary for boundary in boundaries if start < boundary < end), default=end)
+        chunks.append((start, '\n'.join(lines[start - 1:cut - 1])))
+        # Never let the overlap swallow more than half of the chunk
+        start = max(start + 1, cut - min(overlap_lines, (cut - start) // 2))
+
+    return chunks
@@ -0,0 +1,140 @@
+import ast
+from typing import Iterable, List, Optional, Set, Tuple
+from .tokens import estimate_tokens
+
+Span = Tuple[int, int]
+
+def _python_spans(code: str, target_lines: List[int], window: int) -> Optional[Tuple[List[Span], List[Span], List[Span]]]:
+    """
+    Find the interesting regions of a Python file for the target lines.
+
+    Returns the spans (1-based, inclusive) for the enclosing definitions, the imports and
+    the signatures of symbols referenced near the target lines, or None if the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    definitions = [
+        node for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+
+    imports = [
+        (node.lineno, node.end_lineno)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+    enclosing = []
+    referenced: Set[str] = set()
+    for line in target_lines:
+        containing = [node for node in definitions if node.lineno <= line <= node.end_lineno]
+        if containing:
+            # The innermost definition starts last
+            node = max(containing, key=lambda candidate: candidate.lineno)
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            span = (start, node.end_lineno)
+            scope = node
+        else:
+            span = (max(1, line - window), line + window)
+            scope = tree
+        enclosing.append(span)
+
+        for child in ast.walk(scope):
+            if getattr(child, "lineno", None) is None or not span[0] <= child.lineno <= span[1]:
+                continue
+            if isinstance(child, ast.Name):
+                referenced.add(child.id)
+            elif isinstance(child, ast.Attribute):
+                referenced.add(child.attr)
+
+    signatures = []
+    for node in definitions:
+        if node.name not in referenced or any(start <= node.lineno <= end for start, end in enclosing):
+            continue
+        # The signature runs from the def/class line up to the first body statement
+        body_start = node.body[0].lineno if node.body else node.lineno + 1
+        signatures.append((node.lineno, max(node.lineno, body_start - 1)))
+
+    return enclosing, imports, signatures
+
+def _render(lines: List[str], shown: Iterable[int]) -> str:
+    """Render the shown line numbers as a numbered excerpt with elided gaps."""
+    excerpt = []
+    previous = None
+    for line_no in sorted(shown):
+        if previous is not None and line_no != previous + 1:
+            excerpt.append("   ...")
+        excerpt.append(f"{line_no:>6}  {lines[line_no - 1]}")
+        previous = line_no
+    if previous is not None and previous < len(lines):
+        excerpt.append("   ...")
+    return '\n'.join(excerpt)
+
+def build_comment_context(code: str, target_lines: List[int], token_budget: int, window: int = 20, file_path: Optional[str] = None) -> str:
+    """
+    Select the parts of a file an LLM needs to act on review comments.
+
+    Small files are returned unchanged. Larger files are cut down to a line-numbered
+    excerpt: for each target line, the enclosing function or class (Python, via the AST)
+    or a window of lines around it, then the module imports, then the signatures of
+    symbols referenced near the target lines, as far as the token budget allows.
+
+    Args:
+        code (str): The full file content.
+        target_lines (List[int]): 1-based line numbers the comments refer to.
+        token_budget (int): Approximate maximum tokens for the returned context.
+        window (int): Lines of context around a target line outside any definition,
+            or inside a definition too large for the budget.
+        file_path (Optional[str]): The file name, used to detect Python sources.
+
+    Returns:
+        str: The context to send to the LLM.
+    """
+    if not token_budget or estimate_tokens(code) <= token_budget:
+        return code
+
+    lines = code.split('\n')
+    total = len(lines)
+    targets = sorted({min(max(1, line), total) for line in target_lines}) or [1]
+
+    spans = None
+    if file_path is None or file_path.endswith(".py"):
+        spans = _python_spans(code, targets, window)
+    if spans is None:
+        spans = ([(max(1, line - window), line + window) for line in targets], [], [])
+    enclosing, imports, signatures = spans
+
+    shown: Set[int] = set()
+    used = 0
+
+    def add(span: Span, required: bool = False) -> bool:
+        nonlocal used
+        new = [line_no for line_no in range(span[0], min(span[1], total) + 1) if line_no not in shown]
+        cost = sum(estimate_tokens(lines[line_no - 1]) + 2 for line_no in new)
+        if not required and used + cost > token_budget:
+            return False
+        shown.update(new)
+        used += cost
+        return True
+
+    # The lines around each comment are always included
+    for line in targets:
+        add((max(1, line - window), line + window), required=True)
+
+    # Then, in priority order, whole enclosing definitions, imports and referenced signatures
+    for span in enclosing:
+        if not add(span):
+            # Too large to include whole: keep the definition header
+            add((span[0], span[0]))
+    for span in imports:
+        add(span)
+    for span in signatures:
+        add(span)
+
+    return (
+        f"Excerpt of the file ({total} lines total). Each line starts with its line number; "
+        f"unrelated code is elided with '...'.\n{_render(lines, shown)}"
+    )
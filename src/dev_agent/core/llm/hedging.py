@@ -0,0 +1,160 @@
+import time
+import asyncio
+import contextvars
+from collections import Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from .base import LLMInterface, parse_json_object
+from .latency import CallSources, LatencyHistogram, track_sources
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def _is_json_review(text: Any) -> bool:
+    """A usable review is a JSON object, possibly wrapped in a markdown fence."""
+    return isinstance(text, str) and parse_json_object(text) is not None
+
+def _is_text(result: Any) -> bool:
+    return isinstance(result, str) and bool(result.strip())
+
+def _is_dict(result: Any) -> bool:
+    return isinstance(result, dict)
+
+def _is_complete_analysis(result: Any) -> bool:
+    """A batched analysis is usable if every comment got one."""
+    return isinstance(result, dict) and all(isinstance(analysis, dict) for analysis in result.values())
+
+class HedgedLLM(LLMInterface):
+    """
+    Runs calls on an ordered chain of backends with hedging and fallback.
+
+    Each call starts on the first backend. If it has not answered within the hedge
+    delay, the same call is also sent to the next backend in the chain, and the first
+    valid answer wins while the other attempts are cancelled. A failed or invalid answer
+    moves on to the next backend immediately. The hedge delay is the LLM_HEDGE_PERCENTILE
+    latency of the primary backend for that kind of call, taken from its histogram once
+    enough calls have been seen, and never less than min_delay. Answers served entirely
+    from a response cache are not recorded.
+    """
+
+    def __init__(self, backends: List[LLMInterface], names: List[str], hedge_percentile: float = 95.0,
+                 min_delay: float = 1.0, initial_delay: float = 30.0, min_samples: int = 20):
+        self.backends = backends
+        self.names = names
+        self.hedge_percentile = hedge_percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+        # Metrics
+        self.hedged = 0
+        self.fallbacks = 0
+        self.wins: Counter = Counter()
+
+    def _histogram(self, index: int, method: str) -> LatencyHistogram:
+        return self.histograms.setdefault((self.names[index], method), LatencyHistogram())
+
+    def _hedge_delay(self, method: str) -> float:
+        histogram = self._histogram(0, method)
+        if histogram.count < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, histogram.percentile(self.hedge_percentile))
+
+    async def _call(self, method: str, valid: Callable[[Any], bool], *args):
+        hedging = self.hedge_percentile > 0 and len(self.backends) > 1
+        pending: Dict[asyncio.Future, Tuple[int, float, CallSources]] = {}
+        errors: List[Exception] = []
+        invalid = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            # Each attempt runs in its own context, so it reports its own cache hits
+            context = contextvars.copy_context()
+            sources = context.run(track_sources)
+            task = context.run(asyncio.ensure_future, getattr(self.backends[next_index], method)(*args))
+            pending[task] = (next_index, time.monotonic(), sources)
+            next_index += 1
+
+        launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(method) if hedging and next_index < len(self.backends) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("%s on %s is slow, hedging on %s", method, self.names[0], self.names[next_index])
+                    self.hedged += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    index, started, sources = pending.pop(task)
+                    elapsed = time.monotonic() - started
+                    try:
+                        result = task.result()
+                        if not valid(result):
+                            invalid.append(result)
+                            raise ValueError(f"invalid response from {self.names[index]}")
+                    except Exception as e:
+                        logger.warning("%s failed on %s after %.2fs: %s", method, self.names[index], elapsed, e)
+                        errors.append(e)
+                        continue
+                    if not sources.cached_only:
+                        self._histogram(index, method).record(elapsed)
+                    self.wins[self.names[index]] += 1
+                    return result
+
+                if not pending and next_index < len(self.backends):
+                    logger.info("Falling back to %s for %s", self.names[next_index], method)
+                    self.fallbacks += 1
+                    launch()
+        finally:
+            for task, (index, started, _) in pending.items():
+                task.cancel()
+                # A cancelled call took at least this long, so keep it in the histogram
+                # to stop the hedge delay from drifting down
+                self._histogram(index, method).record(time.monotonic() - started)
+        # Every backend failed; an unusable answer is still better than none
+        if invalid:
+            return invalid[-1]
+        raise errors[-1]
+
+    async def generate_code(self, prompt: str) -> str:
+        return await self._call("generate_code", _is_text, prompt)
+
+    async def generate_code_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream from the first backend that starts answering; output already yielded cannot be hedged."""
+        for index, backend in enumerate(self.backends):
+            started = False
+            try:
+                async for text in backend.generate_code_stream(prompt):
+                    started = True
+                    yield text
+                self.wins[self.names[index]] += 1
+                return
+            except Exception as e:
+                if started or index + 1 == len(self.backends):
+                    raise
+                logger.warning("Streaming failed on %s, falling back to %s: %s", self.names[index], self.names[index + 1], e)
+                self.fallbacks += 1
+
+    async def review_code(self, code: str, file_path: Optional[str] = None) -> str:
+        return await self._call("review_code", _is_json_review, code, file_path)
+
+    async def review_diff(self, file_path: str, excerpt: str) -> str:
+        return await self._call("review_diff", _is_json_review, file_path, excerpt)
+
+    async def analyze_review_comment(self, code: str, comment: str, line_number: int, file_path: Optional[str] = None) -> Optional[dict]:
+        return await self._call("analyze_review_comment", _is_dict, code, comment, line_number, file_path)
+
+    async def analyze_review_comments(self, code: str, comments: List[dict], file_path: Optional[str] = None) -> Dict[int, Optional[dict]]:
+        return await self._call("analyze_review_comments", _is_complete_analysis, code, comments, file_path)
+
+    def metrics(self) -> dict:
+        return {
+            "chain": self.names,
+            "hedged": self.hedged,
+            "fallbacks": self.fallbacks,
+            "wins": dict(self.wins),
+            "latency": {f"{name}.{method}": histogram.snapshot() for (name, method), histogram in self.histograms.items()},
+        }
@@ -0,0 +1,86 @@
+import bisect
+from contextvars import ContextVar
+from typing import List, Optional
+
+class LatencyHistogram:
+    """
+    Latency histogram with logarithmic buckets, from 50ms up to about 5 minutes.
+
+    Percentiles are answered with the upper bound of the bucket they fall in, which is
+    accurate to within one bucket (25%) and needs constant memory however many calls
+    are recorded.
+    """
+
+    BOUNDS: List[float] = [round(0.05 * 1.25 ** index, 3) for index in range(40)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the latency below which the given percent of calls completed, or None if empty."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.BOUNDS[index] if index < len(self.BOUNDS) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        """Return the count, mean, common percentiles and non-empty buckets (keyed by upper bound)."""
+        buckets = {}
+        for index, count in enumerate(self.counts):
+            if count:
+                buckets[str(self.BOUNDS[index]) if index < len(self.BOUNDS) else "+Inf"] = count
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+class CallSources:
+    """
+    Where the answers of one backend call came from: real requests or a response cache.
+
+    HedgedLLM starts each backend call with its own CallSources as the current one, and
+    backends report through note_response(), so an answer served entirely from a cache
+    is kept out of the latency histograms; its ~1ms would drag the hedge delay down.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+
+    @property
+    def cached_only(self) -> bool:
+        return self.cache_hits > 0 and self.requests == 0
+
+_current_sources: ContextVar[Optional[CallSources]] = ContextVar("llm_call_sources", default=None)
+
+def track_sources() -> CallSources:
+    """Start recording the sources of the calls made from the current context (and tasks created from it)."""
+    sources = CallSources()
+    _current_sources.set(sources)
+    return sources
+
+def note_response(cached: bool):
+    """Report one answer of the current backend call, served from a cache or by a request."""
+    sources = _current_sources.get()
+    if sources is None:
+        return
+    if cached:
+        sources.cache_hits += 1
+    else:
+        sources.requests += 1
@@ -0,0 +1,30 @@
+from .openai_llm import OpenAILLM
+from .rate_limiter import RateLimiter
+from ...config.settings import Settings
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class LocalLLM(OpenAILLM):
+    """
+    Backend for a local OpenAI-compatible server such as Ollama, llama.cpp or vLLM.
+
+    Uses the same prompts, batching and response cache as OpenAILLM, but sends requests
+    to LOCAL_LLM_URL with LOCAL_LLM_MODEL. Only concurrency is limited, since a local
+    server has no request or token quotas.
+    """
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        logger.debug("Using local model %s at %s", settings.LOCAL_LLM_MODEL, settings.LOCAL_LLM_URL)
+        self.model = settings.LOCAL_LLM_MODEL
+        self.request_options = {
+            "api_base": settings.LOCAL_LLM_URL,
+            # Most local servers ignore the key, but the client requires one
+            "api_key": settings.LOCAL_LLM_API_KEY or "local",
+        }
+        self.limiter = RateLimiter(
+            requests_per_minute=0,
+            tokens_per_minute=0,
+            max_concurrency=settings.LOCAL_LLM_MAX_CONCURRENCY
+        )
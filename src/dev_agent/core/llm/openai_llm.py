@@ -1,88 +1,376 @@
-from .base import LLMInterface
+import json
+import random
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from .base import LLMAccountError, LLMInterface, parse_json_object
 import openai
+from .cache import ResponseCache
+from .latency import note_response
+from .rate_limiter import RateLimiter
+from .tokens import estimate_tokens
+from .context import build_comment_context
+from .chunking import split_code_into_chunks
 from ...config.settings import Settings
+from ...utils.log import get_logger, Payload
+from ...utils.metrics import METRICS
+
+logger = get_logger(__name__)
+
+# Errors that can pass once the provider recovers, retried with backoff like throttling
+_TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+# Error codes for accounts that cannot make requests until someone fixes them
+_ACCOUNT_ERROR_CODES = {"insufficient_quota", "billing_not_active", "account_deactivated", "invalid_api_key"}
+
+def _is_account_error(error: Exception) -> bool:
+    if isinstance(error, (openai.error.AuthenticationError, openai.error.PermissionError)):
+        return True
+    return isinstance(error, openai.error.OpenAIError) and error.code in _ACCOUNT_ERROR_CODES
 
 class OpenAILLM(LLMInterface):
+    """OpenAI chat completions backend, with response caching, rate limiting and retries."""
+
     def __init__(self, settings: Settings):
-        print("\n=== Debug: OpenAI LLM Initialization ===")
-        print(f"Using model: {settings.DEFAULT_MODEL}")
-        print("======================================\n")
+        logger.debug(
+            "Using model %s, response cache %s",
+            settings.DEFAULT_MODEL, "enabled" if settings.LLM_CACHE_ENABLED else "disabled"
+        )
         openai.api_key = settings.OPENAI_API_KEY
+        if settings.OPENAI_API_BASE:
+            openai.api_base = settings.OPENAI_API_BASE
         self.model = settings.DEFAULT_MODEL
+        self.cache = ResponseCache(
+            settings.LLM_CACHE_DIR,
+            max_bytes=settings.LLM_CACHE_MAX_BYTES,
+            max_age=settings.LLM_CACHE_MAX_AGE,
+            enabled=settings.LLM_CACHE_ENABLED
+        )
+        self.limiter = RateLimiter(
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY
+        )
+        self.completion_token_estimate = settings.LLM_COMPLETION_TOKEN_ESTIMATE
+        self.context_token_budget = settings.LLM_CONTEXT_TOKEN_BUDGET
+        self.context_window = settings.LLM_CONTEXT_WINDOW_LINES
+        self.review_chunk_tokens = settings.REVIEW_CHUNK_TOKENS
+        self.review_chunk_overlap = settings.REVIEW_CHUNK_OVERLAP_LINES
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.retry_base_delay = settings.LLM_RETRY_BASE_DELAY
+        self.request_timeout = settings.LLM_REQUEST_TIMEOUT
+        # Per-request API options (api_base, api_key) for backends that are not the global OpenAI client
+        self.request_options: Dict[str, str] = {}
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Return the Retry-After delay in seconds from a rate limit error, if present."""
+        headers = getattr(error, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after") or headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    async def _rate_limited(self, messages: list, **params) -> Tuple[object, int]:
+        """
+        Start an API call under the shared rate limiter, retrying throttled calls and
+        transient errors. This is the only place requests are retried.
+
+        Returns the response and the token estimate it was admitted with. The
+        caller must release the limiter slot once the response is consumed. Raises
+        LLMAccountError if the account cannot make requests.
+        """
+        estimated = sum(estimate_tokens(message["content"]) for message in messages) + self.completion_token_estimate
+        for attempt in range(self.max_retries):
+            waited = await self.limiter.acquire(estimated)
+            METRICS.observe("llm.rate_limit_wait", waited)
+            if waited > 0.1:
+                logger.debug("Waited %.2fs for the rate limiter", waited)
+            try:
+                # For streams this bounds the time until the response starts
+                with METRICS.span("llm.request"):
+                    response = await asyncio.wait_for(
+                        openai.ChatCompletion.acreate(
+                            model=self.model,
+                            messages=messages,
+                            **self.request_options,
+                            **params
+                        ),
+                        self.request_timeout or None
+                    )
+                METRICS.increment("llm_requests", model=self.model, outcome="ok")
+                return response, estimated
+            except openai.error.RateLimitError as e:
+                # An exhausted quota will not recover by waiting
+                if _is_account_error(e):
+                    METRICS.increment("llm_requests", model=self.model, outcome="error")
+                    self.limiter.release(throttled=None)
+                    raise LLMAccountError(str(e)) from e
+                METRICS.increment("llm_requests", model=self.model, outcome="throttled")
+                retry_after = self._retry_after(e)
+                self.limiter.release(throttled=True, retry_after=retry_after)
+                if attempt + 1 == self.max_retries:
+                    raise
+                delay = retry_after or random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                logger.warning("Rate limited by OpenAI, retrying in %.2fs", delay)
+                await asyncio.sleep(delay)
+            except _TRANSIENT_ERRORS as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                METRICS.increment("llm_requests", model=self.model, outcome="timeout" if timed_out else "error")
+                self.limiter.release(throttled=None)
+                if attempt + 1 == self.max_retries:
+                    if timed_out:
+                        raise asyncio.TimeoutError(f"request timed out after {self.request_timeout}s") from None
+                    raise
+                delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                logger.warning("%s from OpenAI, retrying in %.2fs", "Timeout" if timed_out else e, delay)
+                await asyncio.sleep(delay)
+            except (Exception, asyncio.CancelledError) as e:
+                outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+                METRICS.increment("llm_requests", model=self.model, outcome=outcome)
+                # Cancelled calls (e.g. the losing side of a hedge) must free their slot too
+                self.limiter.release(throttled=None)
+                if isinstance(e, Exception) and _is_account_error(e):
+                    raise LLMAccountError(str(e)) from e
+                raise
+
+    async def _chat_completion(self, messages: list, valid: Optional[Callable[[str], bool]] = None, **params) -> str:
+        """
+        Send a chat completion request, serving repeated requests from the cache.
+
+        If valid is given, only responses it accepts are cached or served from the
+        cache, so an unusable answer is asked for again instead of being replayed.
+        """
+        key = self.cache.make_key(self.model, messages, **params)
+        cached = self.cache.get(key)
+        if cached is not None and (valid is None or valid(cached)):
+            logger.debug("Served response from cache")
+            METRICS.increment("llm_cache_hits", model=self.model)
+            note_response(cached=True)
+            return cached
+
+        response, estimated = await self._rate_limited(messages, **params)
+        usage = response.get("usage") or {}
+        self.limiter.release(estimated_tokens=estimated, used_tokens=usage.get("total_tokens"))
+        METRICS.increment("llm_prompt_tokens", usage.get("prompt_tokens") or 0, model=self.model)
+        METRICS.increment("llm_completion_tokens", usage.get("completion_tokens") or 0, model=self.model)
+        content = response.choices[0].message.content
+        note_response(cached=False)
+        if valid is None or valid(content):
+            self.cache.set(key, content)
+        return content
+
+    def metrics(self) -> dict:
+        return {"model": self.model, "cache": self.cache.stats(), "limiter": self.limiter.metrics()}
+
+    @staticmethod
+    def _generation_messages(prompt: str) -> list:
+        return [
+            {"role": "system", "content": (
+                "You are a skilled software developer.\n"
+                "When generating a project, output each file as follows:\n"
+                "=== FILE: relative/path/to/file.py ===\n<file content>\n"
+                "Generate all files and folders as needed for the project.\n"
+                "Do NOT include any explanations, markdown formatting, triple backticks (```), or README.md unless specifically asked.\n"
+                "IMPORTANT: Only output file blocks in the format above. If you include triple backticks, markdown, or any explanation, the code will not be used and the generation will fail with an error."
+            )},
+            {"role": "user", "content": prompt}
+        ]
 
     async def generate_code(self, prompt: str) -> str:
-        print("\n=== Debug: Code Generation ===")
-        print(f"Prompt: {prompt}")
-        print("Sending request to OpenAI...")
+        logger.debug("Generating code for prompt:\n%s", Payload(prompt))
         
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": (
-                        "You are a skilled software developer.\n"
-                        "When generating a project, output each file as follows:\n"
-                        "=== FILE: relative/path/to/file.py ===\n<file content>\n"
-                        "Generate all files and folders as needed for the project.\n"
-                        "Do NOT include any explanations, markdown formatting, triple backticks (```), or README.md unless specifically asked.\n"
-                        "IMPORTANT: Only output file blocks in the format above. If you include triple backticks, markdown, or any explanation, the code will not be used and the generation will fail with an error."
-                    )},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            generated_code = response.choices[0].message.content
-            print("Code generated successfully")
-            print("Generated code:")
-            print("----------------------------------------")
-            print(generated_code)
-            print("----------------------------------------")
-            print("======================================\n")
+            generated_code = await self._chat_completion(self._generation_messages(prompt))
+            logger.debug("Generated code:\n%s", Payload(generated_code))
             return generated_code
         except Exception as e:
-            print(f"Error generating code: {str(e)}")
-            print("======================================\n")
+            logger.error("Error generating code: %s", e)
+            raise
+
+    async def generate_code_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Generate code, yielding the response text as it arrives."""
+        logger.debug("Streaming code generation for prompt:\n%s", Payload(prompt))
+
+        messages = self._generation_messages(prompt)
+        key = self.cache.make_key(self.model, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Served response from cache")
+            METRICS.increment("llm_cache_hits", model=self.model)
+            yield cached
+            return
+
+        try:
+            response, estimated = await self._rate_limited(messages, stream=True)
+        except Exception as e:
+            logger.error("Error generating code: %s", e)
+            raise
+
+        # The limiter slot is held until the stream is fully consumed
+        completed = False
+        parts = []
+        try:
+            async for chunk in response:
+                text = chunk.choices[0].delta.get("content")
+                if text:
+                    parts.append(text)
+                    yield text
+            completed = True
+        except Exception as e:
+            logger.error("Error generating code: %s", e)
             raise
+        finally:
+            self.limiter.release(throttled=False if completed else None)
+            # Streamed responses carry no usage, so their token counts are estimates
+            METRICS.increment("llm_prompt_tokens_estimated", estimated - self.completion_token_estimate, model=self.model)
+            METRICS.increment("llm_completion_tokens_estimated", estimate_tokens(''.join(parts)), model=self.model)
+
+        # Only complete responses are cached, under the same key as generate_code
+        self.cache.set(key, ''.join(parts))
 
-    async def review_code(self, code: str) -> str:
-        print("\n=== Debug: Code Review ===")
-        print("Code to review:")
-        print("----------------------------------------")
-        print(code)
-        print("----------------------------------------")
-        print("Sending request to OpenAI...")
+    REVIEW_SYSTEM_PROMPT = """You are a skilled code reviewer. Review the following code and provide feedback.
+                    Format your response as a JSON object with the following fields:
+                    - issues: list of objects with "line" (the 1-based line number in the code you were given) and "message"
+                    - summary: string summarizing the review
+                    - has_issues: boolean indicating if any issues were found
+                    
+                    IMPORTANT: Make sure your response is valid JSON.
+                    """
+
+    async def review_code(self, code: str, file_path: Optional[str] = None) -> str:
+        """
+        Review a file and return the review as a JSON string.
+
+        Files larger than REVIEW_CHUNK_TOKENS are split into overlapping chunks on
+        syntactic boundaries, the chunks are reviewed concurrently and the issues
+        are merged back with absolute line numbers.
+        """
+        logger.debug("Code to review:\n%s", Payload(code))
+
+        if estimate_tokens(code) > self.review_chunk_tokens:
+            return await self._review_in_chunks(code, file_path)
         
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a skilled code reviewer. Review the following code and provide feedback."},
+            review = await self._chat_completion(
+                [
+                    {"role": "system", "content": self.REVIEW_SYSTEM_PROMPT},
                     {"role": "user", "content": code}
                 ]
             )
-            review = response.choices[0].message.content
-            print("Review generated successfully")
-            print("Review:")
-            print("----------------------------------------")
-            print(review)
-            print("----------------------------------------")
-            print("======================================\n")
+            logger.debug("Review:\n%s", Payload(review))
+            return review
+        except Exception as e:
+            logger.error("Error generating review: %s", e)
+            raise
+
+    async def _review_in_chunks(self, code: str, file_path: Optional[str]) -> str:
+        """Map-reduce review of an oversized file."""
+        chunks = split_code_into_chunks(code, self.review_chunk_tokens, self.review_chunk_overlap, file_path)
+        total = code.count('\n') + 1
+        logger.info("Reviewing %s in %d chunks", file_path or "file", len(chunks))
+
+        async def review_chunk(start: int, chunk: str) -> dict:
+            end = start + chunk.count('\n')
+            review = await self._chat_completion(
+                [
+                    {"role": "system", "content": self.REVIEW_SYSTEM_PROMPT},
+                    {"role": "user", "content": (
+                        f"This is lines {start}-{end} of a {total}-line file. "
+                        f"Report line numbers relative to this excerpt.\n\n{chunk}"
+                    )}
+                ]
+            )
+            logger.debug("Review of lines %d-%d:\n%s", start, end, Payload(review))
+            parsed = parse_json_object(review)
+            if parsed is None:
+                # Keep unstructured feedback instead of dropping it
+                return {"issues": [], "summary": review.strip(), "has_issues": True, "start": start, "end": end}
+            parsed.update(start=start, end=end)
+            return parsed
+
+        try:
+            reviews = await asyncio.gather(*(review_chunk(start, chunk) for start, chunk in chunks))
+        except Exception as e:
+            logger.error("Error generating review: %s", e)
+            raise
+
+        issues = []
+        seen = set()
+        summaries = []
+        for review in reviews:
+            length = review["end"] - review["start"] + 1
+            for issue in review.get("issues") or []:
+                try:
+                    line = int(issue["line"])
+                    message = str(issue["message"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if 1 <= line <= length:
+                    # Shift chunk-relative lines back to absolute file lines
+                    line += review["start"] - 1
+                elif not review["start"] <= line <= review["end"]:
+                    # Neither relative nor absolute within the chunk; anchoring it anywhere would be a guess
+                    logger.debug("Dropping issue on line %s outside lines %d-%d", line, review["start"], review["end"])
+                    continue
+                # Overlapping chunks can report the same issue twice
+                key = (line, ' '.join(message.lower().split()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                issues.append({"line": line, "message": message})
+            if review.get("summary"):
+                summaries.append(f"Lines {review['start']}-{review['end']}: {review['summary']}")
+
+        issues.sort(key=lambda issue: issue["line"])
+        merged = {
+            "issues": issues,
+            "summary": '\n'.join(summaries),
+            "has_issues": bool(issues) or any(review.get("has_issues") for review in reviews)
+        }
+        return json.dumps(merged)
+
+    async def review_diff(self, file_path: str, excerpt: str) -> str:
+        """Review the changed regions of a file given as a line-numbered excerpt."""
+        logger.debug("Excerpt of %s to review:\n%s", file_path, Payload(excerpt))
+        
+        try:
+            review = await self._chat_completion(
+                [
+                    {"role": "system", "content": """You are a skilled code reviewer.
+                    You are given excerpts of a changed file. Each line starts with its line number in the file,
+                    and lines added by the change are marked with '+' after the number. Unrelated regions are elided with '...'.
+                    Review the changes and format your response as a JSON object with the following fields:
+                    - issues: list of objects with "line" (the file line number shown in the excerpt) and "message"
+                    - summary: string summarizing the review
+                    - has_issues: boolean indicating if any issues were found
+                    
+                    IMPORTANT: Only report issues on lines shown in the excerpt, and make sure your response is valid JSON.
+                    """},
+                    {"role": "user", "content": f"File: {file_path}\n\n{excerpt}"}
+                ]
+            )
+            logger.debug("Review:\n%s", Payload(review))
             return review
         except Exception as e:
-            print(f"Error generating review: {str(e)}")
-            print("======================================\n")
+            logger.error("Error generating review: %s", e)
             raise
 
-    async def analyze_review_comment(self, code: str, comment: str, line_number: int) -> dict:
-        """Analyze a review comment and determine if changes are needed."""
-        print("\n=== Debug: Analyzing Review Comment ===")
-        print(f"Comment: {comment}")
-        print(f"Line number: {line_number}")
-        print("Sending request to OpenAI...")
+    async def analyze_review_comment(self, code: str, comment: str, line_number: int, file_path: Optional[str] = None) -> Optional[dict]:
+        """Analyze a review comment and determine if changes are needed. Returns None if the answer can't be parsed."""
+        context = build_comment_context(
+            code, [line_number], self.context_token_budget, self.context_window, file_path
+        )
+        logger.debug("Analyzing review comment on line %s:\n%s", line_number, Payload(comment))
         
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
+            analysis = await self._chat_completion(
+                [
                     {"role": "system", "content": """You are a skilled code reviewer and developer. 
                     Analyze the review comment and determine if changes are needed to the code.
                     If changes are needed, provide the specific code change and a response to the reviewer.
@@ -94,33 +382,98 @@ class OpenAILLM(LLMInterface):
                     IMPORTANT: Make sure your response is valid JSON. Escape all special characters and newlines in strings.
                     """},
                     {"role": "user", "content": f"""Code:
-{code}
+{context}
 
 Review comment on line {line_number}:
 {comment}
 
 Please analyze if changes are needed and provide the response in the specified JSON format."""}
-                ]
+                ],
+                valid=lambda text: parse_json_object(text) is not None
+            )
+        except Exception as e:
+            logger.error("Error analyzing review comment: %s", e)
+            # Let API errors propagate so callers can retry them
+            raise
+
+        logger.debug("Analysis:\n%s", Payload(analysis))
+
+        parsed = parse_json_object(analysis)
+        if parsed is None:
+            logger.warning("Could not parse the review comment analysis")
+        return parsed
+
+    @staticmethod
+    def _parse_edits(analysis: str) -> Optional[Dict[int, dict]]:
+        """Parse a batched analysis into edits by comment ID, or return None if it is malformed."""
+        parsed = parse_json_object(analysis)
+        if parsed is None or not isinstance(parsed.get("edits"), list):
+            return None
+        try:
+            return {int(edit["comment_id"]): edit for edit in parsed["edits"]}
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    async def analyze_review_comments(self, code: str, comments: List[dict], file_path: Optional[str] = None) -> Dict[int, Optional[dict]]:
+        """
+        Analyze several review comments on one file in a single request.
+
+        Args:
+            code (str): The file content, sent once for all comments.
+            comments (List[dict]): Comments with "id", "line" and "body" keys.
+            file_path (Optional[str]): The file name, used to slice Python files on AST boundaries.
+
+        Returns:
+            Dict[int, Optional[dict]]: The analysis for each comment ID, with the same fields
+                as analyze_review_comment, or None for comments without a usable analysis
+                (the answer could not be parsed or skipped the comment).
+        """
+        logger.debug("Analyzing %d review comments in one request", len(comments))
+        
+        context = build_comment_context(
+            code, [comment["line"] for comment in comments], self.context_token_budget, self.context_window, file_path
+        )
+        comment_list = "\n\n".join(
+            f"Comment ID {comment['id']} on line {comment['line']}:\n{comment['body']}"
+            for comment in comments
+        )
+        try:
+            analysis = await self._chat_completion(
+                [
+                    {"role": "system", "content": """You are a skilled code reviewer and developer.
+                    Analyze each review comment on the file and determine if changes are needed to the code.
+                    Consider all comments together so that suggested changes do not conflict with each other.
+                    Format your response as a JSON object with a single field "edits", a list with one object per comment:
+                    - comment_id: the ID of the comment
+                    - change_needed: boolean indicating if a change is needed
+                    - suggested_change: string with the new code for the commented line if change is needed
+                    - response: string with a response to the reviewer
+                    
+                    IMPORTANT: Make sure your response is valid JSON. Escape all special characters and newlines in strings.
+                    """},
+                    {"role": "user", "content": f"""Code:
+{context}
+
+Review comments:
+{comment_list}
+
+Please analyze if changes are needed for each comment and provide the response in the specified JSON format."""}
+                ],
+                valid=lambda text: self._parse_edits(text) is not None
             )
-            analysis = response.choices[0].message.content
-            print("Analysis generated successfully")
-            print("Analysis:")
-            print("----------------------------------------")
-            print(analysis)
-            print("----------------------------------------")
-            print("======================================\n")
-            
-            # Clean up the response to handle control characters
-            analysis = analysis.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-            # Parse the JSON response
-            import json
-            return json.loads(analysis)
         except Exception as e:
-            print(f"Error analyzing review comment: {str(e)}")
-            print("======================================\n")
-            # Return a default response if there's an error
-            return {
-                "change_needed": False,
-                "suggested_change": "",
-                "response": f"Error analyzing comment: {str(e)}"
-            }
\ No newline at end of file
+            logger.error("Error analyzing review comments: %s", e)
+            # Let API errors propagate so callers can retry them
+            raise
+
+        logger.debug("Analysis:\n%s", Payload(analysis))
+
+        edits = self._parse_edits(analysis)
+        if edits is None:
+            logger.warning("Could not parse the review comments analysis")
+            edits = {}
+        results = {}
+        for comment in comments:
+            edit = edits.get(comment["id"])
+            results[comment["id"]] = edit if isinstance(edit, dict) else None
+        return results
@@ -0,0 +1,142 @@
+import time
+import asyncio
+from typing import Optional
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate. A rate of 0 disables it."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: int) -> float:
+        """Return how many seconds until amount tokens are available."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        # A single request larger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: int):
+        if self.capacity:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: int):
+        """Refund (positive) or charge (negative) tokens once the real cost is known."""
+        if self.capacity:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+class RateLimiter:
+    """
+    Client-side limiter shared by all LLM calls.
+
+    Combines request-per-minute and token-per-minute buckets with an AIMD
+    concurrency limit: every successful call raises the limit by 1/limit (about
+    one slot per round of calls), every throttled call halves it, and a
+    Retry-After from the provider pauses all new calls until it has passed.
+
+    The limiter only uses asyncio.sleep, so it can be shared across event loops.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_concurrency: int, min_concurrency: int = 1):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.calls = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _delay(self, tokens: int) -> Optional[float]:
+        """Seconds to wait before a call may start, None if waiting on a free slot."""
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency_limit):
+            return None
+        return max(self.requests.delay_for(1), self.tokens.delay_for(tokens))
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until a call estimated at the given tokens may start, and return the wait time."""
+        start = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            while True:
+                delay = self._delay(tokens)
+                if delay is not None and delay <= 0:
+                    break
+                await asyncio.sleep(self.POLL_INTERVAL if delay is None else delay)
+        finally:
+            self.queue_depth -= 1
+
+        # No await between the check and the bookkeeping, so this is atomic on the event loop
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        self.calls += 1
+
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self, throttled: Optional[bool] = False, retry_after: Optional[float] = None,
+                estimated_tokens: Optional[int] = None, used_tokens: Optional[int] = None):
+        """
+        Finish a call started with acquire.
+
+        Args:
+            throttled (Optional[bool]): True if the provider rate limited the call, False if it
+                succeeded, None for other failures (which leave the concurrency limit unchanged).
+            retry_after (Optional[float]): Seconds the provider asked us to wait.
+            estimated_tokens (Optional[int]): The estimate passed to acquire.
+            used_tokens (Optional[int]): The tokens the call actually used, if reported.
+        """
+        self.in_flight -= 1
+        if throttled:
+            self.throttled += 1
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        elif throttled is False:
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+
+        if estimated_tokens is not None and used_tokens is not None:
+            self.tokens.adjust(estimated_tokens - used_tokens)
+
+    def metrics(self) -> dict:
+        """Return queueing and throttling metrics for this process."""
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "concurrency_limit": round(self.concurrency_limit, 2),
+            "total_wait": round(self.total_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+            "avg_wait": round(self.total_wait / self.calls, 3) if self.calls else 0.0,
+        }
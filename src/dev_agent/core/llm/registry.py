@@ -0,0 +1,51 @@
+import importlib
+from typing import Callable, Dict, List, Union
+from .base import LLMInterface
+from ...config.settings import Settings
+
+Factory = Callable[[Settings], LLMInterface]
+
+# Built-in backends are referenced by import path so that only the selected one is imported
+_BACKENDS: Dict[str, Union[str, Factory]] = {
+    "openai": "dev_agent.core.llm.openai_llm:OpenAILLM",
+    "local": "dev_agent.core.llm.local_llm:LocalLLM",
+    "canned": "dev_agent.core.llm.canned_llm:CannedLLM",
+}
+
+def register_backend(name: str, factory: Union[str, Factory]):
+    """
+    Register an LLM backend under a name usable in the LLM_*BACKEND settings.
+
+    Args:
+        name (str): The backend name.
+        factory (Union[str, Factory]): A callable taking the Settings and returning an
+            LLMInterface, or its "module:attribute" import path.
+    """
+    _BACKENDS[name] = factory
+
+def available_backends() -> List[str]:
+    """Return the names of the registered backends."""
+    return sorted(_BACKENDS)
+
+def create_llm(spec: str, settings: Settings) -> LLMInterface:
+    """
+    Create a backend from a "name" or "name:model" spec.
+
+    Raises:
+        ValueError: If no backend is registered under the name, or a model is given
+            for a backend without one.
+    """
+    name, _, model = spec.partition(":")
+    try:
+        factory = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend {name!r}, expected one of: {', '.join(available_backends())}")
+    if isinstance(factory, str):
+        module_name, _, attribute = factory.partition(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+    llm = factory(settings)
+    if model:
+        if not hasattr(llm, "model"):
+            raise ValueError(f"LLM backend {name!r} does not take a model")
+        llm.model = model
+    return llm
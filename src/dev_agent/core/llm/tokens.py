@@ -0,0 +1,58 @@
+import math
+from typing import Callable, List, TypeVar
+
+T = TypeVar("T")
+
+# Rough average for English text and source code with GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use, if tiktoken is installed."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+def estimate_tokens(text: str) -> int:
+    """Count the tokens in a piece of text, exactly with tiktoken or estimated from its length."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def split_by_token_budget(items: List[T], budget: int, fixed_tokens: int, measure: Callable[[T], int]) -> List[List[T]]:
+    """
+    Split items into batches that fit a token budget.
+
+    Args:
+        items (List[T]): The items to batch, in order.
+        budget (int): The maximum tokens per request.
+        fixed_tokens (int): Tokens every batch pays regardless of its items (e.g. shared context).
+        measure (Callable[[T], int]): Returns the token cost of a single item.
+
+    Returns:
+        List[List[T]]: Batches in the original order. Every batch holds at least one
+            item, so an item that alone exceeds the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    used = fixed_tokens
+    for item in items:
+        cost = measure(item)
+        if current and used + cost > budget:
+            batches.append(current)
+            current = []
+            used = fixed_tokens
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
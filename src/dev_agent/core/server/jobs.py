@@ -0,0 +1,139 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class Job(NamedTuple):
+    """A unit of work for one pull request."""
+    kind: str  # "review" or "respond"
+    repo: str
+    pr: int
+    branch: str
+    head_sha: str = ""  # The PR head the event was sent for
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        """Jobs are keyed per pull request, whatever their kind."""
+        return (self.repo.lower(), self.pr)
+
+class JobQueue:
+    """
+    Asyncio job queue with a bounded number of workers that serializes work per pull request.
+
+    Each pull request has at most one pending job of each kind: a job submitted while one
+    of the same kind is still pending for the PR is merged into it. A PR's pending jobs run
+    one after another on one worker. Jobs submitted while the PR is being processed are
+    deferred until it finishes, so bursts of events cost at most one extra run and a PR is
+    never processed twice at the same time, not even by a review and a respond. A review
+    of a head that was already reviewed, such as a redelivered event, is skipped.
+
+    The handler returns the head SHA it processed, if known.
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[Optional[str]]], workers: int):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Pending jobs by PR, then by kind, in submission order
+        self._queued: Dict[Tuple[str, int], Dict[str, Job]] = {}
+        self._running: Dict[Tuple[str, int], Job] = {}
+        self._deferred: Dict[Tuple[str, int], Dict[str, Job]] = {}
+        # The last head SHA reviewed successfully, by PR
+        self._reviewed: Dict[Tuple[str, int], str] = {}
+
+        # Metrics
+        self.submitted = 0
+        self.merged = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the workers on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers, abandoning queued jobs."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _already_reviewed(self, job: Job) -> bool:
+        if job.kind != "review" or not job.head_sha:
+            return False
+        running = self._running.get(job.key)
+        if running is not None and running.kind == "review" and running.head_sha == job.head_sha:
+            return True
+        return self._reviewed.get(job.key) == job.head_sha
+
+    def submit(self, job: Job) -> bool:
+        """
+        Queue a job. Returns False if it was merged into a pending job of the same kind,
+        or dropped as a review of a head that is being or was already reviewed.
+        """
+        self.submitted += 1
+        key = job.key
+        if self._already_reviewed(job):
+            logger.info("%s#%d head %s is already reviewed", job.repo, job.pr, job.head_sha[:7])
+            self.merged += 1
+            return False
+        if key in self._running:
+            pending = self._deferred.setdefault(key, {})
+        elif key in self._queued:
+            pending = self._queued[key]
+        else:
+            pending = self._queued[key] = {}
+            self._queue.put_nowait(key)
+        merged = job.kind in pending
+        # Keep the newest branch name in case the PR head changed
+        pending[job.kind] = job
+        if merged:
+            self.merged += 1
+        return not merged
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self._queue.get()
+            jobs = self._queued.pop(key)
+            try:
+                for job in jobs.values():
+                    # The review before this one may have seen a newer head than its event
+                    if self._already_reviewed(job):
+                        logger.info("Skipping review of %s#%d, head %s is already reviewed", job.repo, job.pr, job.head_sha[:7])
+                        self.merged += 1
+                        continue
+                    self._running[key] = job
+                    try:
+                        logger.info("Worker %d running %s for %s#%d", index, job.kind, job.repo, job.pr)
+                        head_sha = await self.handler(job)
+                        self.completed += 1
+                        if job.kind == "review":
+                            self._reviewed[key] = head_sha or job.head_sha
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error("Job %s for %s#%d failed: %s", job.kind, job.repo, job.pr, e, exc_info=True)
+            finally:
+                self._running.pop(key, None)
+                deferred = self._deferred.pop(key, None)
+                if deferred is not None:
+                    self._queued[key] = deferred
+                    self._queue.put_nowait(key)
+                self._queue.task_done()
+
+    def metrics(self) -> dict:
+        """Return queue counters for this process."""
+        return {
+            "workers": self.workers,
+            "queued": sum(len(jobs) for jobs in self._queued.values()),
+            "running": len(self._running),
+            "deferred": sum(len(jobs) for jobs in self._deferred.values()),
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
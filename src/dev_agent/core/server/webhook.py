@@ -0,0 +1,188 @@
+import hmac
+import json
+import asyncio
+import hashlib
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple, Union
+from .jobs import Job, JobQueue
+from ...utils.log import get_logger
+from ...utils.metrics import METRICS
+
+logger = get_logger(__name__)
+
+# GitHub caps webhook payloads at 25 MB
+MAX_BODY_BYTES = 25 * 1024 * 1024
+# Seconds a client gets to send its request before the connection is dropped
+READ_TIMEOUT = 30
+
+REVIEW_ACTIONS = {"opened", "reopened", "synchronize", "ready_for_review"}
+RESPOND_ACTIONS = {"created"}
+
+# Text bodies are OpenMetrics expositions; everything else is JSON
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check a GitHub X-Hub-Signature-256 header.
+
+    Args:
+        secret (str): The webhook secret.
+        body (bytes): The raw request body.
+        signature (Optional[str]): The header value, e.g. "sha256=<hex>".
+
+    Returns:
+        bool: True if the signature matches.
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def job_for_event(event: str, payload: dict, ignore_sender: str = "") -> Optional[Job]:
+    """
+    Map a webhook event to the job it should trigger.
+
+    New or updated (non-draft) pull requests are reviewed, and new review comments
+    are responded to. Events caused by ignore_sender, the agent's own account, return
+    None, so its reviews, replies and commits don't trigger more jobs. Every other
+    event returns None too.
+    """
+    sender = (payload.get("sender") or {}).get("login") or ""
+    if ignore_sender and sender.lower() == ignore_sender.lower():
+        return None
+    pull_request = payload.get("pull_request") or {}
+    repo = (payload.get("repository") or {}).get("full_name")
+    head = pull_request.get("head") or {}
+    branch = head.get("ref")
+    if not repo or not branch or pull_request.get("number") is None:
+        return None
+
+    action = payload.get("action")
+    if event == "pull_request" and action in REVIEW_ACTIONS and not pull_request.get("draft"):
+        return Job("review", repo, pull_request["number"], branch, head.get("sha") or "")
+    if event == "pull_request_review_comment" and action in RESPOND_ACTIONS:
+        return Job("respond", repo, pull_request["number"], branch, head.get("sha") or "")
+    return None
+
+class WebhookServer:
+    """
+    Minimal HTTP/1.1 receiver for GitHub webhooks.
+
+    POST /webhook accepts pull_request and pull_request_review_comment events and hands
+    them to the job queue; GET /healthz reports the queue metrics, and GET /metrics the
+    stage timings and counters of the process in the OpenMetrics text format (as JSON at
+    GET /metrics.json). Each connection serves a single request.
+    """
+
+    def __init__(self, queue: JobQueue, repo: str, secret: str = "", host: str = "127.0.0.1", port: int = 8080,
+                 ignore_sender: str = ""):
+        self.queue = queue
+        self.repo = repo
+        self.secret = secret
+        self.ignore_sender = ignore_sender
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening on the running event loop."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        if not self.secret:
+            logger.warning("GITHUB_WEBHOOK_SECRET is not set; webhook signatures are not verified")
+        logger.info("Listening for webhooks on http://%s:%d/webhook", self.host, self.port)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, body = await self._handle_request(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.debug("Bad webhook request: %s", e)
+            status, body = HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+        except asyncio.TimeoutError:
+            logger.debug("Webhook request not received within %ds", READ_TIMEOUT)
+            status, body = HTTPStatus.REQUEST_TIMEOUT, {"error": "request timeout"}
+
+        if isinstance(body, str):
+            data, content_type = body.encode(), OPENMETRICS_CONTENT_TYPE
+        else:
+            data, content_type = json.dumps(body).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, path, _ = request_line.split(" ", 2)
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"body too large ({length} bytes)")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    async def _handle_request(self, reader: asyncio.StreamReader) -> Tuple[HTTPStatus, Union[dict, str]]:
+        # An idle connection would otherwise hold its task forever
+        method, path, headers, body = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+
+        if path == "/healthz":
+            return HTTPStatus.OK, self.queue.metrics()
+        if path == "/metrics":
+            return HTTPStatus.OK, METRICS.to_openmetrics()
+        if path == "/metrics.json":
+            return HTTPStatus.OK, METRICS.to_dict()
+        if path != "/webhook":
+            return HTTPStatus.NOT_FOUND, {"error": "not found"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+        if self.secret and not verify_signature(self.secret, body, headers.get("x-hub-signature-256")):
+            logger.warning("Rejected webhook with an invalid signature")
+            return HTTPStatus.UNAUTHORIZED, {"error": "invalid signature"}
+
+        event = headers.get("x-github-event", "")
+        if event == "ping":
+            return HTTPStatus.OK, {"status": "pong"}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "invalid JSON"}
+
+        job = job_for_event(event, payload, self.ignore_sender)
+        if job is None:
+            logger.debug(
+                "Ignoring %s event (%s) from %s", event, payload.get("action"), (payload.get("sender") or {}).get("login")
+            )
+            return HTTPStatus.OK, {"status": "ignored"}
+        if job.repo.lower() != self.repo.lower():
+            logger.warning("Ignoring %s event for unexpected repository %s", event, job.repo)
+            return HTTPStatus.OK, {"status": "ignored"}
+
+        queued = self.queue.submit(job)
+        logger.info(
+            "%s %s job for %s#%d (delivery %s)",
+            "Queued" if queued else "Merged", job.kind, job.repo, job.pr, headers.get("x-github-delivery")
+        )
+        return HTTPStatus.ACCEPTED, {"status": "queued" if queued else "merged", "job": job.kind, "pr": job.pr}
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Set
+from ...utils.log import get_logger
+
+logger = get_logger(__name__)
+
+class StateStore:
+    """
+    Local SQLite record of the review comments the agent has already handled.
+
+    Each row is keyed by repository, pull request and comment ID, and keeps the file
+    blob SHA the comment was analyzed against, the LLM decision and the commit that
+    addressed it, so repeated runs only have to look at new comments.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS comments (
+            repo TEXT NOT NULL,
+            pr INTEGER NOT NULL,
+            comment_id INTEGER NOT NULL,
+            path TEXT,
+            blob_sha TEXT,
+            status TEXT NOT NULL,
+            decision TEXT,
+            commit_sha TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (repo, pr, comment_id)
+        )
+    """
+
+    # Statuses
+    ADDRESSED = "addressed"
+    NO_CHANGE = "no_change"
+    REPLY = "reply"
+
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = Path(os.path.expanduser(path))
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        # Runs call the store from executor threads, one at a time per connection
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            # WAL lets a polling agent read while another run writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def handled_ids(self, repo: str, pr: int, statuses: Optional[Iterable[str]] = None) -> Set[int]:
+        """
+        Return the IDs of the comments on a pull request that need no further work.
+
+        Args:
+            repo (str): The repository full name (owner/name).
+            pr (int): The pull request number.
+            statuses (Optional[Iterable[str]]): Only return comments with these statuses.
+        """
+        if not self.enabled:
+            return set()
+        query = "SELECT comment_id FROM comments WHERE repo = ? AND pr = ?"
+        params = [repo, pr]
+        if statuses is not None:
+            statuses = list(statuses)
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        try:
+            with self._lock:
+                rows = self.conn.execute(query, params)
+                return {row[0] for row in rows}
+        except sqlite3.Error as e:
+            logger.warning("Failed to read state store %s: %s", self.path, e)
+            return set()
+
+    def record(self, repo: str, pr: int, entries: Iterable[dict]):
+        """
+        Record handled comments in one transaction.
+
+        Args:
+            repo (str): The repository full name (owner/name).
+            pr (int): The pull request number.
+            entries (Iterable[dict]): Dicts with comment_id and status, and optionally
+                path, blob_sha, decision and commit_sha.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        rows = [
+            (
+                repo, pr, entry["comment_id"], entry.get("path"), entry.get("blob_sha"), entry["status"],
+                json.dumps(entry["decision"]) if entry.get("decision") is not None else None,
+                entry.get("commit_sha"), now
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO comments "
+                    "(repo, pr, comment_id, path, blob_sha, status, decision, commit_sha, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to update state store %s: %s", self.path, e)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,301 +1,623 @@
 import sys
 from pathlib import Path
 import os
-import re
-import json
 import typer
 import asyncio
-from typing import Optional, Dict, Tuple
-from .config.settings import Settings
-from .core.llm.openai_llm import OpenAILLM
-from .core.git.git_manager import GitManager
+import random
+import time
+from typing import Awaitable, Callable, Optional, Dict, NamedTuple, Tuple, List, TYPE_CHECKING
+from .core.git.diff import build_review_excerpt, parse_patch, snap_to_line
+from .core.code_generator.parser import FileBlockParser
+from .core.llm.base import LLMAccountError, parse_json_object
+from .core.llm.tokens import estimate_tokens, split_by_token_budget
+from .utils.log import get_logger, configure_logging, Payload
+from .utils.metrics import METRICS, span
+from .utils.concurrency import bounded_map
 import tempfile
 
-# Initialize settings and components
-settings = Settings()
-llm = OpenAILLM(settings)
-git = GitManager(settings)
+if TYPE_CHECKING:
+    from .config.settings import Settings
+    from .core.llm.base import LLMInterface
+    from .core.llm.hedging import HedgedLLM
+    from .core.git.git_manager import GitManager
+    from .core.state.store import StateStore
+
+# Components are built on first use so that --help and commands that don't
+# need them skip settings loading, GitHub lookups and the workspace fetch
+_settings: Optional["Settings"] = None
+# Settings given on the command line, applied when the settings are loaded
+_settings_overrides: Dict[str, object] = {}
+_backends: Dict[str, "LLMInterface"] = {}
+_llms: Dict[str, "HedgedLLM"] = {}
+_git: Optional["GitManager"] = None
+_state: Optional["StateStore"] = None
+
+def get_settings() -> "Settings":
+    """Return the shared settings, loading them on first use."""
+    global _settings
+    if _settings is None:
+        from .config.settings import Settings
+        _settings = Settings(**_settings_overrides)
+    return _settings
+
+def _get_backend(spec: str) -> "LLMInterface":
+    """Return the shared backend for a "name" or "name:model" spec."""
+    if spec not in _backends:
+        from .core.llm.registry import create_llm
+        _backends[spec] = create_llm(spec, get_settings())
+    return _backends[spec]
+
+def get_llm(command: Optional[str] = None) -> "LLMInterface":
+    """
+    Return the shared LLM for a command, creating it on first use.
+
+    The primary backend is LLM_<COMMAND>_BACKEND if set, otherwise LLM_BACKEND, followed
+    by the LLM_FALLBACK_BACKENDS chain for hedging and fallback. Commands configured
+    with the same backends share their instances, cache and rate limits.
+    """
+    settings = get_settings()
+    primary = (getattr(settings, f"LLM_{command.upper()}_BACKEND", "") if command else "") or settings.LLM_BACKEND
+    if primary not in _llms:
+        from .core.llm.hedging import HedgedLLM
+        fallbacks = [spec.strip() for spec in settings.LLM_FALLBACK_BACKENDS.split(",") if spec.strip()]
+        chain = [primary] + [spec for spec in fallbacks if spec != primary]
+        _llms[primary] = HedgedLLM(
+            [_get_backend(spec) for spec in chain],
+            chain,
+            hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+            min_delay=settings.LLM_HEDGE_MIN_DELAY,
+            initial_delay=settings.LLM_HEDGE_INITIAL_DELAY,
+            min_samples=settings.LLM_HEDGE_MIN_SAMPLES
+        )
+    return _llms[primary]
+
+def get_git() -> "GitManager":
+    """Return the shared git manager, creating it on first use."""
+    global _git
+    if _git is None:
+        from .core.git.git_manager import GitManager
+        _git = GitManager(get_settings())
+    return _git
+
+def get_state() -> "StateStore":
+    """Return the shared state store, creating it on first use."""
+    global _state
+    if _state is None:
+        from .core.state.store import StateStore
+        settings = get_settings()
+        _state = StateStore(settings.STATE_DB_PATH, settings.STATE_ENABLED)
+    return _state
+
+logger = get_logger(__name__)
 
 # Create Typer app
 app = typer.Typer()
 
 @app.command()
 def respond(
-    branch_name: str = typer.Argument(..., help="Branch name (e.g. feature/my-branch)")
+    branch_names: List[str] = typer.Argument(None, help="Branch names (e.g. feature/my-branch); several run as a batch"),
+    all_open: bool = typer.Option(False, "--all-open", help="Respond on every open pull request"),
+    concurrency: int = typer.Option(None, "--concurrency", help="Number of comments to analyze at once, per pull request"),
+    max_prs: int = typer.Option(None, "--max-prs", help="Number of pull requests to process at once in a batch"),
+    reprocess: bool = typer.Option(False, "--reprocess", help="Also analyze comments handled by earlier runs, except the agent's own replies")
 ):
     """Respond to review comments and make necessary code changes."""
-    print(f"\n=== Debug: Respond Command ===")
-    print(f"Branch name: {branch_name}")
-    print("======================================\n")
+    branch_names = _check_branches(branch_names, all_open)
+    try:
+        if all_open or len(branch_names) > 1:
+            ok = asyncio.run(_batch(
+                "respond", branch_names, max_prs,
+                lambda pr: _respond(pr.head.ref, concurrency, reprocess, pr=pr)
+            ))
+            if not ok:
+                raise typer.Exit(1)
+        else:
+            asyncio.run(_respond(branch_names[0], concurrency, reprocess))
+    finally:
+        _report_run()
+
+def _check_branches(branch_names: Optional[List[str]], all_open: bool) -> List[str]:
+    """Validate the branch arguments of review and respond."""
+    branch_names = list(branch_names or [])
+    if all_open and branch_names:
+        raise typer.BadParameter("Pass either branch names or --all-open, not both")
+    if not all_open and not branch_names:
+        raise typer.BadParameter("Pass at least one branch name, or --all-open")
+    return branch_names
+
+class _ReviewComment(NamedTuple):
+    """The parts of a review comment that respond uses, without the rest of the API object."""
+    id: int
+    path: str
+    line: Optional[int]
+    body: str
+
+class _FileResponse(NamedTuple):
+    """The outcome of responding to the comments on one file."""
+    blob_sha: str
+    # The updated file, unless it is unchanged or was uploaded as a blob
+    content: Optional[str]
+    uploaded_sha: Optional[str]
+    addressed: List[dict]
+    unchanged: List[Tuple[_ReviewComment, dict]]
+
+def _comment_line(comment) -> Optional[int]:
+    """Return the file line a review comment is on; older PyGithub releases only keep it in the raw data."""
+    line = getattr(comment, "line", None)
+    if line is None:
+        line = getattr(comment, "_rawData", {}).get("line")
+    return line
+
+def _in_reply_to(comment) -> Optional[int]:
+    """
+    The ID of the review comment a comment replies to, or None.
+
+    Listings omit in_reply_to_id on top-level comments, and reading the missing
+    attribute would make PyGithub fetch every such comment again, so read the raw data.
+    """
+    return comment._rawData.get("in_reply_to_id")
 
+async def _fetch_file_content(
+    file_path: str,
+    branch_name: str,
+    semaphore: asyncio.Semaphore,
+    blob_sha: Optional[str] = None
+) -> Optional[Tuple[str, str]]:
+    """Fetch a file and its blob SHA from the branch (or by blob SHA, if known) without blocking the event loop."""
+    git = get_git()
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        try:
+            with span("fetch_file"):
+                return await loop.run_in_executor(None, git.read_file, file_path, branch_name, blob_sha)
+        except Exception as e:
+            logger.error("Error fetching %s: %s", file_path, e)
+            return None
+
+async def _analyze_comment_batch(file_path: str, file_content: str, comments: list, semaphore: asyncio.Semaphore) -> List[Optional[dict]]:
+    """
+    Analyze a batch of comments on one file in a single LLM call.
+
+    Comments whose analysis could not be parsed are asked about again with jittered
+    backoff. Failed calls are not: the LLM backend already retried throttling and
+    transient errors. Returns one analysis per comment, in order, with None for the
+    comments that still have no usable analysis, which the next run picks up again.
+    """
+    settings = get_settings()
+    llm = get_llm("respond")
+    results: Dict[int, Optional[dict]] = {}
+    remaining = list(comments)
+    max_retries = settings.LLM_MAX_RETRIES
+    for attempt in range(max_retries):
+        batch = [
+            {"id": comment.id, "line": _comment_line(comment) or 1, "body": comment.body}
+            for comment in remaining
+        ]
+        comment_ids = ', '.join(str(comment.id) for comment in remaining)
+        async with semaphore:
+            logger.debug("Analyzing comments %s on %s", comment_ids, file_path)
+
+            try:
+                with span("respond.llm"):
+                    analyses = await llm.analyze_review_comments(file_content, batch, file_path)
+                for comment in remaining:
+                    results[comment.id] = analyses.get(comment.id)
+            except LLMAccountError:
+                raise
+            except Exception as e:
+                logger.error("Error analyzing review comments %s: %s", comment_ids, e)
+                break
+            remaining = [comment for comment in remaining if results[comment.id] is None]
+            if not remaining:
+                break
+            logger.warning("No usable analysis for comments %s", ', '.join(str(comment.id) for comment in remaining))
+
+        if attempt + 1 == max_retries:
+            logger.error("Max retries reached for comments %s", ', '.join(str(comment.id) for comment in remaining))
+            break
+
+        # Exponential backoff with full jitter, outside the semaphore
+        delay = random.uniform(0, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        logger.info("Retrying comments %s in %.2fs", ', '.join(str(comment.id) for comment in remaining), delay)
+        await asyncio.sleep(delay)
+
+    return [results.get(comment.id) for comment in comments]
+
+async def _respond_to_file(
+    file_path: str,
+    comments: List[_ReviewComment],
+    branch_name: str,
+    semaphore: asyncio.Semaphore,
+    blob_sha: Optional[str] = None
+) -> Optional[_FileResponse]:
+    """
+    Fetch one commented file, analyze its comments and apply the suggested changes.
+
+    Returns None if the file could not be fetched. Updated files over
+    RESPOND_INLINE_MAX_CHARS are uploaded as blobs before returning.
+    """
+    settings = get_settings()
+    fetched = await _fetch_file_content(file_path, branch_name, semaphore, blob_sha)
+    if fetched is None:
+        return None
+    file_content, blob_sha = fetched
+    del fetched
+
+    # Batch the comments so the file is sent once per batch, splitting batches
+    # that would exceed the token budget
+    batches = split_by_token_budget(
+        comments,
+        settings.LLM_BATCH_TOKEN_BUDGET,
+        # The file is sliced down to the context budget before it is sent
+        fixed_tokens=min(estimate_tokens(file_content), settings.LLM_CONTEXT_TOKEN_BUDGET),
+        measure=lambda comment: estimate_tokens(comment.body)
+    )
+    results = await asyncio.gather(
+        *(_analyze_comment_batch(file_path, file_content, batch, semaphore) for batch in batches)
+    )
+
+    logger.info("Processing file: %s", file_path)
+    changes_needed = []
+    unchanged = []
     try:
-        # Get the pull request
-        prs = git.repo.get_pulls(state='all', head=branch_name)
-        print(f"\n=== Debug: Pull Requests ===")
-        print(f"PRs type: {type(prs)}")
-        print(f"PRs count: {prs.totalCount}")
-        print("======================================\n")
-        
-        if prs.totalCount == 0:
-            typer.echo(f"Error: No pull request found for branch {branch_name}")
-            return
+        # Collect the comments that need changes
+        for batch, batch_results in zip(batches, results):
+            for comment, analysis_dict in zip(batch, batch_results):
+                if analysis_dict and not analysis_dict.get("change_needed", False):
+                    unchanged.append((comment, analysis_dict))
+                if analysis_dict and analysis_dict.get("change_needed", False):
+                    change = {
+                        'comment': comment,
+                        'analysis': analysis_dict,
+                        'position': comment.line or 1
+                    }
+                    logger.debug("Change needed for comment %s at line %s", comment.id, change['position'])
+                    changes_needed.append(change)
+
+        logger.debug("%d changes needed for %s", len(changes_needed), file_path)
+        for change in changes_needed:
+            logger.debug(
+                "Change at line %s:\n%s",
+                change['position'], Payload(change['analysis'].get('suggested_change'))
+            )
 
-        pr = prs[0]
-        print(f"\n=== Debug: Pull Request Object ===")
-        print(f"PR type: {type(pr)}")
-        print(f"PR number: {pr.number}")
-        print(f"PR state: {pr.state}")
-        print(f"PR title: {pr.title}")
-        print("======================================\n")
+        if not changes_needed:
+            logger.info("No changes needed for %s", file_path)
+            return _FileResponse(blob_sha, None, None, [], unchanged)
 
-        print(f"Found pull request: {pr.html_url}")
+        # Make the changes, editing the lines in place so only one copy of the file is alive
+        lines = file_content.split('\n')
+        del file_content
+        for change in sorted(changes_needed, key=lambda x: x.get('position', 0), reverse=True):
+            new_code = change['analysis'].get('suggested_change')
+            if new_code:
+                if 'position' in change and change['position'] is not None:
+                    line_num = change['position'] - 1  # Convert to 0-based index
+                    lines[line_num] = new_code
+                else:
+                    lines.append(new_code)
+        new_content = '\n'.join(lines)
+        del lines
+
+        uploaded_sha = None
+        if len(new_content) > settings.RESPOND_INLINE_MAX_CHARS:
+            # Upload large files now rather than holding them until the commit
+            loop = asyncio.get_running_loop()
+            with span("respond.upload_blob"):
+                uploaded_sha = await loop.run_in_executor(None, get_git().create_blob, new_content)
+            new_content = None
+        return _FileResponse(blob_sha, new_content, uploaded_sha, changes_needed, unchanged)
+
+    except Exception as e:
+        logger.error("Error processing %s: %s", file_path, e)
+        return _FileResponse(blob_sha, None, None, [], unchanged)
+
+async def _respond(
+    branch_name: str,
+    concurrency: Optional[int] = None,
+    reprocess: bool = False,
+    pr=None
+) -> Optional[str]:
+    """Async implementation of respond command. Returns a one-line outcome for batch summaries."""
+    settings = get_settings()
+    git = get_git()
+    state = get_state()
+    repo_name = f"{settings.GITHUB_REPO_OWNER}/{settings.GITHUB_REPO_NAME}"
+    concurrency = max(1, concurrency or settings.RESPOND_CONCURRENCY)
+    logger.debug("Respond command: branch=%s concurrency=%s", branch_name, concurrency)
+    # PyGithub and the state store block, so their calls run in executor threads and
+    # other pull requests of a batch run or webhook server make progress meanwhile
+    loop = asyncio.get_running_loop()
+
+    try:
+        # Get the pull request, unless a batch run already listed it
+        if pr is None:
+            with span("find_pr"):
+                pr = await loop.run_in_executor(None, _find_pr, branch_name)
+            if pr is None:
+                typer.echo(f"Error: No pull request found for branch {branch_name}")
+                return "no pull request"
+        logger.debug("Pull request #%s (%s): %s", pr.number, pr.state, pr.title)
+        logger.info("Found pull request: %s", pr.html_url)
 
         # Get all review comments
         comments = pr.get_review_comments()
-        print(f"\n=== Debug: Review Comments ===")
-        print(f"Comments type: {type(comments)}")
-        print(f"Comments count: {comments.totalCount}")
-        print("======================================\n")
+        total = await loop.run_in_executor(None, lambda: comments.totalCount)
+        logger.debug("Review comments: %d", total)
         
-        if comments.totalCount == 0:
+        if total == 0:
             typer.echo("No review comments found")
-            return
+            return "no review comments"
+
+        # Skip comments handled by earlier runs, including our own replies. Reprocessing
+        # analyzes the handled review comments again, but never our own replies.
+        handled = await loop.run_in_executor(
+            None, state.handled_ids, repo_name, pr.number, [state.REPLY] if reprocess else None
+        )
+        # Our replies are recognized by author too, so they are skipped without a state store
+        agent_login = (await loop.run_in_executor(None, lambda: git.agent_login)).lower()
+
+        # Group comments by file, keeping only the fields we need instead of the API objects
+        def group_comments() -> Dict[str, List[_ReviewComment]]:
+            grouped: Dict[str, List[_ReviewComment]] = {}
+            for comment in git.iterate_pages(comments):
+                if comment.id in handled or _in_reply_to(comment) in handled:
+                    continue
+                if agent_login and comment.user is not None and comment.user.login.lower() == agent_login:
+                    continue
+                logger.debug(
+                    "Comment %s on %s line %s (position %s):\n%s",
+                    comment.id, comment.path, _comment_line(comment), comment.position, Payload(comment.body)
+                )
+                
+                if comment.path not in grouped:
+                    grouped[comment.path] = []
+                grouped[comment.path].append(
+                    _ReviewComment(comment.id, comment.path, _comment_line(comment), comment.body)
+                )
+            return grouped
+
+        with span("respond.list_comments"):
+            file_comments = await loop.run_in_executor(None, group_comments)
+
+        if not file_comments:
+            typer.echo("No new review comments found")
+            return "no new review comments"
 
-        # Group comments by file
-        file_comments = {}
-        for comment in comments:
-            print(f"\n=== Debug: Comment Object ===")
-            print(f"Comment type: {type(comment)}")
-            print(f"Comment ID: {comment.id}")
-            print(f"Comment Path: {comment.path}")
-            print(f"Comment Position: {comment.position}")
-            print(f"Comment Line: {comment.line}")
-            print(f"Comment Body: {comment.body}")
-            print("======================================\n")
-            
-            if comment.path not in file_comments:
-                file_comments[comment.path] = []
-            file_comments[comment.path].append(comment)
-
-        print(f"\n=== Debug: File Comments Dictionary ===")
         for file_path, comments_list in file_comments.items():
-            print(f"\nFile: {file_path}")
-            print(f"Number of comments: {len(comments_list)}")
-            for comment in comments_list:
-                print(f"  - Comment ID: {comment.id}")
-                print(f"  - Comment Position: {comment.position}")
-                print(f"  - Comment Line: {comment.line}")
-        print("======================================\n")
-
-        # Process each file
-        for file_path, comments in file_comments.items():
-            print(f"\nProcessing file: {file_path}")
+            logger.debug("%s: %d comments", file_path, len(comments_list))
 
-            try:
-                # Get current file content
-                file_content = git.repo.get_contents(file_path, ref=branch_name).decoded_content.decode()
-                lines = file_content.split('\n')
-
-                # Analyze comments and determine changes needed
-                changes_needed = []
-                for comment in comments:
-                    print(f"\n=== Debug: Processing Comment ===")
-                    print(f"Comment ID: {comment.id}")
-                    print(f"Comment Line: {comment.line}")
-                    print(f"Comment Position: {comment.position}")
-                    print("======================================\n")
-
-                    print(f"Sending request to OpenAI...")
-
-                    # Add retry logic for OpenAI API calls
-                    max_retries = 3
-                    retry_count = 0
-                    while retry_count < max_retries:
-                        try:
-                            # Analyze the comment
-                            analysis = llm.analyze_review_comment(comment.body, file_content)
-                            print("Analysis generated successfully")
-                            print("Analysis:")
-                            print("-" * 40)
-                            print(analysis)
-                            print("-" * 40)
-
-                            # Parse the analysis
-                            try:
-                                # Clean up the analysis string before parsing
-                                analysis = analysis.strip()
-                                if analysis.startswith('```json'):
-                                    analysis = analysis[7:]
-                                if analysis.endswith('```'):
-                                    analysis = analysis[:-3]
-                                analysis = analysis.strip()
-                                
-                                print(f"\n=== Debug: JSON Analysis ===")
-                                print(f"Analysis before parsing: {analysis}")
-                                analysis_dict = json.loads(analysis)
-                                print(f"Analysis after parsing: {analysis_dict}")
-                                print("======================================\n")
-
-                                if analysis_dict.get("change_needed", False):
-                                    print(f"\n=== Debug: Change Needed ===")
-                                    print(f"Comment line: {comment.line}")
-                                    print(f"Comment position: {comment.position}")
-                                    change = {
-                                        'comment': comment,
-                                        'analysis': analysis_dict,
-                                        'position': comment.line or 1
-                                    }
-                                    print(f"Change position: {change['position']}")
-                                    changes_needed.append(change)
-                                    print("======================================\n")
-                                break  # Success, exit retry loop
-                            except json.JSONDecodeError as e:
-                                print(f"Error parsing analysis: {e}")
-                                print(f"Analysis content: {analysis}")
-                                retry_count += 1
-                                if retry_count == max_retries:
-                                    print("Max retries reached for JSON parsing")
-                                    break
-                                continue
-                        except Exception as e:
-                            print(f"Error analyzing review comment: {e}")
-                            if "account is not active" in str(e):
-                                typer.echo("Error: OpenAI API account is not active. Please check your billing details.")
-                                return
-                            retry_count += 1
-                            if retry_count == max_retries:
-                                print("Max retries reached for OpenAI API call")
-                                break
-                            continue
-
-                print(f"\n=== Debug: Changes Needed ===")
-                print(f"Number of changes: {len(changes_needed)}")
-                for change in changes_needed:
-                    print(f"Change position: {change['position']}")
-                    print(f"Change suggested: {change['analysis'].get('suggested_change')[:100]}...")
-                print("======================================\n")
-
-                if not changes_needed:
-                    print(f"No changes needed for {file_path}")
+        # The blob SHAs of the commented files at the PR head let their contents be read
+        # from the workspace clone after one fetch of the PR head, or else fetched by SHA,
+        # which the GitHub response cache serves without a request once seen
+        await loop.run_in_executor(None, git.fetch_pull_request, pr.number, pr.head.sha)
+        with span("respond.list_files"):
+            head_blobs = await loop.run_in_executor(None, lambda: {
+                file.filename: file.sha
+                for file in git.iterate_pages(pr.get_files())
+                if file.filename in file_comments and file.status != "removed"
+            })
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # Fetch, analyze and edit the files as a pipeline with at most `concurrency` files
+        # in flight. Only the new contents (or blob SHAs of large files, uploaded right
+        # away) and the per-comment decisions are kept until the commit.
+        file_paths = list(file_comments)
+        updated_files = {}
+        uploaded_blobs = {}
+        blob_shas = {}
+        addressed = []
+        unchanged = []
+        try:
+            responses = bounded_map(
+                file_paths,
+                lambda file_path: _respond_to_file(
+                    file_path, file_comments[file_path], branch_name, semaphore, head_blobs.get(file_path)
+                ),
+                concurrency
+            )
+            async for file_path, response in responses:
+                if response is None:
                     continue
+                blob_shas[file_path] = response.blob_sha
+                unchanged.extend(response.unchanged)
+                addressed.extend(response.addressed)
+                if response.content is not None:
+                    updated_files[file_path] = response.content
+                elif response.uploaded_sha is not None:
+                    uploaded_blobs[file_path] = response.uploaded_sha
+        except LLMAccountError as e:
+            typer.echo(f"Error: The LLM provider rejected the account, please check the API key and billing details: {e}")
+            return "LLM account rejected"
 
-                # Make the changes
-                new_lines = lines.copy()
-                for change in sorted(changes_needed, key=lambda x: x.get('position', 0), reverse=True):
-                    new_code = change['analysis'].get('suggested_change')
-                    if new_code:
-                        if 'position' in change and change['position'] is not None:
-                            line_num = change['position'] - 1  # Convert to 0-based index
-                            new_lines[line_num] = new_code
-                        else:
-                            new_lines.append(new_code)
-
-                # Write the changes
-                new_content = '\n'.join(new_lines)
-                git.repo.update_file(
-                    path=file_path,
-                    message=f"Address review comments for {file_path}",
-                    content=new_content,
-                    sha=git.repo.get_contents(file_path, ref=branch_name).sha,
-                    branch=branch_name
-                )
+        # Files finish in any order; reply in PR file order
+        order = {file_path: index for index, file_path in enumerate(file_paths)}
+        addressed.sort(key=lambda change: order[change['comment'].path])
+        changed_paths = sorted(list(updated_files) + list(uploaded_blobs), key=order.get)
 
-                # Respond to the comments
-                for change in changes_needed:
-                    comment = change['comment']
-                    response = f"✅ Addressed: {change['analysis'].get('response', 'Changes made based on review')}"
-                    try:
-                        # Create a review comment reply
-                        pr.create_review_comment(
-                            body=response,
-                            commit_id=comment.commit_id,
-                            path=comment.path,
-                            position=comment.position,
-                            in_reply_to=comment.id
+        # Comments that need no change are done; failed analyses are retried next run
+        await loop.run_in_executor(None, state.record, repo_name, pr.number, [
+            {
+                "comment_id": comment.id,
+                "path": comment.path,
+                "blob_sha": blob_shas[comment.path],
+                "status": state.NO_CHANGE,
+                "decision": analysis_dict
+            }
+            for comment, analysis_dict in unchanged
+        ])
+
+        if changed_paths:
+            # Commit all files in one commit and one ref update
+            with span("respond.commit"):
+                commit_sha = await loop.run_in_executor(None, lambda: git.commit_files(
+                    branch_name,
+                    updated_files,
+                    f"Address review comments for {', '.join(changed_paths)}",
+                    blobs=uploaded_blobs,
+                    # The files were read at the PR head; don't revert anything pushed since
+                    base_sha=pr.head.sha
+                ))
+
+            # Respond to the comments
+            handled_entries = []
+            for change in addressed:
+                comment = change['comment']
+                handled_entries.append({
+                    "comment_id": comment.id,
+                    "path": comment.path,
+                    "blob_sha": blob_shas[comment.path],
+                    "status": state.ADDRESSED,
+                    "decision": change['analysis'],
+                    "commit_sha": commit_sha
+                })
+                response = f"✅ Addressed: {change['analysis'].get('response', 'Changes made based on review')}"
+                try:
+                    # Create a review comment reply
+                    with span("respond.reply"):
+                        reply = await loop.run_in_executor(
+                            None, pr.create_review_comment_reply, comment.id, response
                         )
-                        print(f"Responded to comment: {comment.id}")
-                    except Exception as e:
-                        print(f"Error responding to comment: {e}")
+                    logger.info("Responded to comment: %s", comment.id)
+                    # Our replies show up as review comments on the next run
+                    handled_entries.append({
+                        "comment_id": reply.id,
+                        "path": comment.path,
+                        "status": state.REPLY,
+                        "commit_sha": commit_sha
+                    })
+                except Exception as e:
+                    logger.error("Error responding to comment: %s", e)
 
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+            await loop.run_in_executor(None, state.record, repo_name, pr.number, handled_entries)
 
         typer.echo(f"Successfully responded to review comments: {pr.html_url}")
+        return f"{len(addressed)} addressed, {len(unchanged)} need no change"
 
     except Exception as e:
         typer.echo(f"Error responding to review: {e}")
+        # A batch run or webhook job reports the failure against this pull request
+        if pr is not None:
+            raise
 
 @app.command()
 def generate(
     task: str = typer.Argument(..., help="Task description"),
     branch_name: str = typer.Argument(..., help="Branch name (e.g. my-feature)"),
     create_mr: bool = typer.Option(False, "--create-mr", help="Create merge request"),
-    mr_title: str = typer.Option(None, "--mr-title", help="Merge request title")
+    mr_title: str = typer.Option(None, "--mr-title", help="Merge request title"),
+    stream: Optional[bool] = typer.Option(None, "--stream/--no-stream", help="Stream the LLM output and write files as they complete")
 ):
     """Generate code based on task description and create a feature branch."""
-    asyncio.run(_generate(task, branch_name, create_mr, mr_title))
+    try:
+        asyncio.run(_generate(task, branch_name, create_mr, mr_title, stream))
+    finally:
+        _report_run()
+
+def _write_generated_file(file_path: str, file_content: str) -> Tuple[str, bool]:
+    """
+    Write a generated file into the workspace unless it is unchanged.
+
+    Returns the absolute path and whether the file was created or modified.
+    """
+    from .core.code_generator.writer import write_if_changed
+    git = get_git()
+    abs_path = os.path.join(git.workspace_path, file_path)
+    return abs_path, write_if_changed(abs_path, file_content)
 
 async def _generate(
     task: str,
     branch_name: str,
     create_mr: bool,
-    mr_title: Optional[str]
+    mr_title: Optional[str],
+    stream: Optional[bool] = None
 ):
     """Async implementation of generate command."""
-    print(f"\n=== Debug: Generate Command ===")
-    print(f"Task: {task}")
-    print(f"Branch name: {branch_name}")
-    print(f"Create MR: {create_mr}")
-    print(f"MR title: {mr_title}")
-    print("======================================\n")
+    settings = get_settings()
+    git = get_git()
+    llm = get_llm("generate")
+    stream = settings.LLM_STREAM if stream is None else stream
+    logger.debug(
+        "Generate command: task=%r branch=%s create_mr=%s mr_title=%r stream=%s",
+        task, branch_name, create_mr, mr_title, stream
+    )
 
     try:
         # Create feature branch
-        branch = git.create_feature_branch(branch_name)
-        print(f"Created feature branch: {branch}")
-
-        # Generate code (expecting multi-file structure in response)
-        generated_code = await llm.generate_code(task)
-        print("Generated code successfully")
-
-        # More robust regex: tolerate whitespace, optional leading slash, optional triple backticks (with or without language), and print raw output if parsing fails
-        file_pattern = re.compile(
-            r"^\s*=+ FILE: ?/?([\w\-/\.]+) =+\s*\n"  # delimiter, optional leading slash
-            r"(?:```[a-zA-Z]*\n)?"                        # optional triple backtick with/without language
-            r"(.*?)"                                      # file content (non-greedy)
-            r"(?:\n```)?"                                # optional closing triple backtick
-            r"(?=\n\s*=+ FILE: |\n\s*=+ FILE: END =+|\Z)",  # next delimiter or end
-            re.DOTALL | re.MULTILINE
-        )
+        with span("generate.create_branch"):
+            branch = git.create_feature_branch(branch_name)
+        logger.info("Created feature branch: %s", branch)
+
+        # Generate code (expecting multi-file structure in response) and write
+        # each file as soon as its block is complete
+        parser = FileBlockParser()
         files_written = []
-        for match in file_pattern.finditer(generated_code + '\n=== FILE: END ==='):
-            file_path, file_content = match.group(1).strip(), match.group(2).strip()
-            abs_path = os.path.join(git.workspace_path, file_path)
-            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-            with open(abs_path, 'w') as f:
-                f.write(file_content)
-            files_written.append(file_path)
-            print(f"Wrote code to {abs_path}")
-
-        # If no valid file delimiters are found, print raw LLM output to a temp file for debugging
-        if not files_written:
-            with tempfile.NamedTemporaryFile('w', delete=False, suffix='.llm_output.txt') as tmpf:
+        files_changed = []
+        start_time = time.monotonic()
+
+        def write_blocks(blocks):
+            for file_path, file_content in blocks:
+                with span("generate.write_file"):
+                    abs_path, changed = _write_generated_file(file_path, file_content)
+                files_written.append(file_path)
+                if changed:
+                    files_changed.append(file_path)
+                elapsed = time.monotonic() - start_time
+                if len(files_written) == 1:
+                    logger.info("Time to first file: %.2fs", elapsed)
+                if changed:
+                    typer.echo(f"[{len(files_written)}] Wrote {abs_path} ({elapsed:.1f}s)")
+                else:
+                    typer.echo(f"[{len(files_written)}] Unchanged {abs_path} ({elapsed:.1f}s)")
+
+        # Keep the raw LLM output on disk instead of in memory, for debugging failed parses
+        # The generation span includes parsing and writing, which overlap with the stream
+        with tempfile.NamedTemporaryFile('w', delete=False, suffix='.llm_output.txt') as tmpf, span("generate.llm"):
+            debug_path = tmpf.name
+            if stream:
+                async for text in llm.generate_code_stream(task):
+                    tmpf.write(text)
+                    with span("generate.parse"):
+                        blocks = parser.feed(text)
+                    write_blocks(blocks)
+            else:
+                generated_code = await llm.generate_code(task)
                 tmpf.write(generated_code)
-                debug_path = tmpf.name
+                with span("generate.parse"):
+                    blocks = parser.feed(generated_code)
+                write_blocks(blocks)
+                del generated_code
+            write_blocks(parser.close())
+        logger.info(
+            "Generated %d files (%d changed) in %.1fs",
+            len(files_written), len(files_changed), time.monotonic() - start_time
+        )
+
+        # If no valid file delimiters are found, keep the raw LLM output for debugging
+        if not files_written:
             typer.echo(f"Error: No valid file delimiters (=== FILE: ...) found in LLM output. Generation failed. Raw LLM output saved to {debug_path} for debugging.")
             raise RuntimeError("No valid file delimiters found in LLM output.")
+        os.remove(debug_path)
 
-        # Commit and push changes
-        git.commit_changes(f"feat: {task}")
-        git.push_changes(branch)
-        print("Pushed changes to remote")
+        # Stage only the generated paths (git skips the unchanged ones cheaply) rather than
+        # the whole workspace, and don't make an identical commit
+        with span("generate.commit"):
+            committed = git.commit_changes(f"feat: {task}", paths=files_written)
+        if committed:
+            with span("generate.push"):
+                git.push_changes(branch)
+            logger.info("Pushed changes to remote")
+        else:
+            typer.echo(f"No changes: all {len(files_written)} generated files match the branch")
 
         # Create merge request if requested
         if create_mr:
             title = mr_title or f"feat: {task}"
             description = f"Generated code for: {task}"
-            mr_url = git.create_merge_request(branch, title, description)
-            print(f"Created merge request: {mr_url}")
+            with span("generate.create_pr"):
+                mr_url = git.create_merge_request(branch, title, description)
+            logger.info("Created merge request: %s", mr_url)
             return mr_url
 
     except Exception as e:
@@ -304,125 +626,435 @@ async def _generate(
 
 @app.command()
 def review(
-    branch_name: str = typer.Argument(..., help="Branch name (e.g. feature/my-branch)"),
-    approve: bool = typer.Option(False, "--approve", help="Approve the PR if no issues found")
+    branch_names: List[str] = typer.Argument(None, help="Branch names (e.g. feature/my-branch); several run as a batch"),
+    all_open: bool = typer.Option(False, "--all-open", help="Review every open pull request"),
+    approve: bool = typer.Option(False, "--approve", help="Approve the PR if no issues found"),
+    concurrency: int = typer.Option(None, "--concurrency", help="Number of files to review at once, per pull request"),
+    max_prs: int = typer.Option(None, "--max-prs", help="Number of pull requests to review at once in a batch"),
+    diff_only: Optional[bool] = typer.Option(None, "--diff-only/--full-file", help="Review only the changed hunks instead of whole files")
 ):
     """Review code changes in a pull request."""
-    asyncio.run(_review(branch_name, approve))
+    branch_names = _check_branches(branch_names, all_open)
+    try:
+        if all_open or len(branch_names) > 1:
+            ok = asyncio.run(_batch(
+                "review", branch_names, max_prs,
+                lambda pr: _review(pr.head.ref, approve, concurrency, diff_only, pr=pr)
+            ))
+            if not ok:
+                raise typer.Exit(1)
+        else:
+            asyncio.run(_review(branch_names[0], approve, concurrency, diff_only))
+    finally:
+        _report_run()
+
+async def _review_file(file, branch_name: str, diff_only: bool) -> Optional[Tuple[str, Optional[List[int]]]]:
+    """
+    Fetch a changed file and review it.
+
+    Returns the raw review and, in diff mode, the lines that can carry review comments.
+    """
+    settings = get_settings()
+    git = get_git()
+    llm = get_llm("review")
+    if file.status == "removed":
+        return None
+
+    logger.info(
+        "Reviewing %s (%s, +%s -%s, %s)",
+        file.filename, file.status, file.additions, file.deletions,
+        "diff" if diff_only and file.patch else "full file"
+    )
+
+    window = settings.REVIEW_DIFF_CONTEXT_LINES
+    content = None
+    # Binary or very large files have no patch, so review them whole
+    if not (diff_only and file.patch) or window > 0:
+        # Get the file content without blocking the event loop
+        loop = asyncio.get_running_loop()
+        with span("fetch_file"):
+            # The listing gives the blob SHA, which the GitHub response cache can serve
+            content, _ = await loop.run_in_executor(None, git.read_file, file.filename, branch_name, file.sha)
+
+    with span("review.llm"):
+        if diff_only and file.patch:
+            excerpt, commentable = build_review_excerpt(file.patch, content, window)
+            return await llm.review_diff(file.filename, excerpt), commentable
+
+        # Review the code
+        return await llm.review_code(content, file.filename), None
+
+def _find_pr(branch_name: str):
+    """Look up the newest pull request for a branch, or None if there is none. Blocks on the API."""
+    prs = get_git().repo.get_pulls(state='all', head=branch_name)
+    logger.debug("Pull requests for %s: %d", branch_name, prs.totalCount)
+    if prs.totalCount == 0:
+        return None
+    return prs[0]
+
+def _review_body(body: str, unanchored: List[str]) -> str:
+    """Append the issues that could not be anchored on a diff line to the review body."""
+    if not unanchored:
+        return body
+    return body + "\n\nIssues outside the changed lines:\n" + '\n'.join(f"- {note}" for note in unanchored)
+
+# GitHub's 422 errors for review comments whose anchor is not on the diff
+_ANCHOR_ERRORS = ("line could not be resolved", "path could not be resolved", "must be part of the diff",
+                  "position", "start_line")
+
+def _create_review(pr, event: str, **kwargs) -> str:
+    """
+    Create a review, submitting it as a plain comment if GitHub rejects the event.
+
+    GitHub refuses APPROVE and REQUEST_CHANGES on a pull request opened by the same
+    account, as after `generate --create-mr` with one token. Returns the event used.
+    """
+    from github.GithubException import GithubException
+
+    try:
+        pr.create_review(event=event, **kwargs)
+        return event
+    except GithubException as e:
+        if e.status != 422 or event == "COMMENT" or "your own pull request" not in str(e).lower():
+            raise
+        logger.warning("GitHub rejected the %s review (%s), submitting it as COMMENT", event, e)
+    pr.create_review(event="COMMENT", **kwargs)
+    return "COMMENT"
+
+def _submit_review(pr, event: str, body: str, comments: List[dict], unanchored: List[str]) -> str:
+    """
+    Submit a review with all its line comments in a single API call.
+
+    GitHub rejects the whole review (422) if any comment's anchor is invalid. Only then
+    are the comments posted one by one against the head commit, the ones that still fail
+    are moved into the review body, and the review is submitted without line comments.
+    Any other rejection is raised before a comment is posted. Returns the event used.
+    """
+    from github.GithubException import GithubException
+
+    unanchored = list(unanchored)
+    if comments:
+        try:
+            return _create_review(pr, event, body=_review_body(body, unanchored), comments=comments)
+        except GithubException as e:
+            if e.status != 422 or not any(error in str(e).lower() for error in _ANCHOR_ERRORS):
+                raise
+            logger.warning("Review with %d comments was rejected (%s), posting comments individually", len(comments), e)
+
+        head = get_git().repo.get_commit(pr.head.sha)
+        for comment in comments:
+            try:
+                pr.create_review_comment(
+                    body=comment["body"],
+                    commit=head,
+                    path=comment["path"],
+                    line=comment["line"],
+                    side=comment["side"]
+                )
+            except GithubException as e:
+                logger.warning("Could not comment on %s line %s: %s", comment["path"], comment["line"], e)
+                unanchored.append(f"`{comment['path']}` line {comment['line']}: {comment['body']}")
+
+    return _create_review(pr, event, body=_review_body(body, unanchored))
 
 async def _review(
     branch_name: str,
-    approve: bool
-):
-    """Async implementation of review command."""
-    print(f"\n=== Debug: Review Command ===")
-    print(f"Branch name: {branch_name}")
-    print(f"Auto approve: {approve}")
-    print(f"Reviewer: {settings.GIT_AUTHOR_NAME} <{settings.GIT_AUTHOR_EMAIL}>")
-    print("======================================\n")
+    approve: bool,
+    concurrency: Optional[int] = None,
+    diff_only: Optional[bool] = None,
+    pr=None
+) -> Optional[str]:
+    """Async implementation of review command. Returns a one-line outcome for batch summaries."""
+    settings = get_settings()
+    git = get_git()
+    concurrency = max(1, concurrency or settings.REVIEW_CONCURRENCY)
+    diff_only = settings.REVIEW_DIFF_ONLY if diff_only is None else diff_only
+    logger.debug(
+        "Review command: branch=%s approve=%s concurrency=%s diff_only=%s reviewer=%s <%s>",
+        branch_name, approve, concurrency, diff_only, settings.GIT_AUTHOR_NAME, settings.GIT_AUTHOR_EMAIL
+    )
+    # PyGithub blocks, so its calls run in executor threads like in _respond
+    loop = asyncio.get_running_loop()
 
     try:
-        # Get the pull request
-        prs = git.repo.get_pulls(state='all', head=branch_name)
-        print(f"\n=== Debug: Pull Requests ===")
-        print(f"PRs type: {type(prs)}")
-        print(f"PRs count: {prs.totalCount}")
-        print("======================================\n")
-        
-        if prs.totalCount == 0:
-            typer.echo(f"Error: No pull request found for branch {branch_name}")
-            return
-
-        pr = prs[0]
-        print(f"\n=== Debug: Pull Request Object ===")
-        print(f"PR type: {type(pr)}")
-        print(f"PR number: {pr.number}")
-        print(f"PR state: {pr.state}")
-        print(f"PR title: {pr.title}")
-        print("======================================\n")
-
-        print(f"Found pull request: {pr.html_url}")
-
-        # Get the files changed in the PR
-        files = pr.get_files()
+        # Get the pull request, unless a batch run already listed it
+        if pr is None:
+            with span("find_pr"):
+                pr = await loop.run_in_executor(None, _find_pr, branch_name)
+            if pr is None:
+                typer.echo(f"Error: No pull request found for branch {branch_name}")
+                return "no pull request"
+        logger.debug("Pull request #%s (%s): %s", pr.number, pr.state, pr.title)
+        logger.info("Found pull request: %s", pr.html_url)
+
         has_issues = False
 
-        for file in files:
-            print(f"\n=== Debug: Reviewing File ===")
-            print(f"File: {file.filename}")
-            print(f"Status: {file.status}")
-            print(f"Changes: +{file.additions} -{file.deletions}")
-            print("======================================\n")
+        # Fetch the PR head into the workspace clone once, so files are read locally
+        if not diff_only or settings.REVIEW_DIFF_CONTEXT_LINES > 0:
+            await loop.run_in_executor(None, git.fetch_pull_request, pr.number, pr.head.sha)
 
-            # Get the file content
-            if file.status != "removed":
-                content = git.repo.get_contents(file.filename, ref=branch_name).decoded_content.decode()
-                
-                # Review the code
-                review = await llm.review_code(content)
-                print(f"\nCode Review for {file.filename}:")
-                print("-" * 40)
-                print(review)
-                print("-" * 40)
+        # Collect every line comment so the whole review is submitted in one API call.
+        # Files are listed page by page and reviewed as they arrive, with at most
+        # `concurrency` files in flight; once a file is reviewed only its comments are
+        # kept, so memory does not grow with the size of the PR.
+        comments = []
+        unanchored = []
+        reviews = bounded_map(
+            enumerate(git.iterate_pages(pr.get_files())),
+            lambda entry: _review_file(entry[1], branch_name, diff_only),
+            concurrency
+        )
+        async for (index, file), result in reviews:
+            if result is None:
+                continue
+            review, commentable = result
 
-                try:
-                    # Parse the review response
-                    # Expecting format: {"issues": [{"line": int, "message": str}], "summary": str, "has_issues": bool}
-                    review_dict = json.loads(review)
-                    
-                    # Create review comments for each issue
-                    if review_dict.get("has_issues", False):
-                        has_issues = True
-                        for issue in review_dict.get("issues", []):
-                            try:
-                                # Create a review comment with author information
-                                pr.create_review_comment(
-                                    body=issue["message"],
-                                    commit_id=file.sha,
-                                    path=file.filename,
-                                    line=issue["line"],
-                                    author=f"{settings.GIT_AUTHOR_NAME} <{settings.GIT_AUTHOR_EMAIL}>"
-                                )
-                                print(f"Created review comment for line {issue['line']}")
-                            except Exception as e:
-                                print(f"Error creating review comment: {e}")
-
-                except json.JSONDecodeError:
-                    # If the review is not in JSON format, post it as a general comment
-                    pr.create_issue_comment(
-                        f"Review for {file.filename}:\n\n{review}",
-                        author=f"{settings.GIT_AUTHOR_NAME} <{settings.GIT_AUTHOR_EMAIL}>"
-                    )
-                    # Assume there might be issues if we can't parse the response
-                    has_issues = True
+            logger.debug("Code review for %s:\n%s", file.filename, Payload(review))
+
+            # Parse the review response, tolerating markdown fences like the LLM chain does
+            # Expecting format: {"issues": [{"line": int, "message": str}], "summary": str, "has_issues": bool}
+            review_dict = parse_json_object(review)
+            if review_dict is None:
+                # If the review is not in JSON format, post it as a general comment
+                await loop.run_in_executor(
+                    None, pr.create_issue_comment, f"Review for {file.filename}:\n\n{review}"
+                )
+                # Assume there might be issues if we can't parse the response
+                has_issues = True
+                continue
+
+            if review_dict.get("has_issues", False):
+                has_issues = True
+                # Comments must anchor on a line that is part of the diff
+                diff_lines = None if commentable is not None else set(parse_patch(file.patch)[0]) if file.patch else set()
+                for issue in review_dict.get("issues") or []:
+                    # Check each issue on its own so one malformed issue doesn't sink the review
+                    if not isinstance(issue, dict) or not issue.get("message"):
+                        logger.warning("Skipping malformed issue in the review of %s: %r", file.filename, issue)
+                        continue
+                    message = str(issue["message"])
+                    try:
+                        reported = int(issue.get("line"))
+                    except (TypeError, ValueError):
+                        unanchored.append((index, f"`{file.filename}`: {message}"))
+                        continue
+                    if commentable is not None:
+                        line = snap_to_line(reported, commentable)
+                    else:
+                        line = reported if reported in diff_lines else None
+                    if line is None:
+                        logger.debug("No diff line to anchor issue on %s line %s", file.filename, reported)
+                        unanchored.append((index, f"`{file.filename}` line {reported}: {message}"))
+                        continue
+                    comments.append((index, {
+                        "path": file.filename,
+                        "line": line,
+                        "side": "RIGHT",
+                        "body": message
+                    }))
+
+        # Files finish in any order; list the comments in PR file order
+        comments = [comment for _, comment in sorted(comments, key=lambda entry: entry[0])]
+        unanchored = [note for _, note in sorted(unanchored, key=lambda entry: entry[0])]
 
         # Create the review
         if approve and not has_issues:
-            pr.create_review(
-                body="All changes look good! 👍",
-                event="APPROVE",
-                author=f"{settings.GIT_AUTHOR_NAME} <{settings.GIT_AUTHOR_EMAIL}>"
-            )
-            print("Approved the pull request")
+            event = "APPROVE"
+            body = "All changes look good! 👍"
         else:
             event = "COMMENT" if not has_issues else "REQUEST_CHANGES"
-            pr.create_review(
-                body="Review completed. Please check the comments for details.",
-                event=event,
-                author=f"{settings.GIT_AUTHOR_NAME} <{settings.GIT_AUTHOR_EMAIL}>"
-            )
-            print(f"Created review with event: {event}")
+            body = "Review completed. Please check the comments for details."
+        with span("review.submit"):
+            event = await loop.run_in_executor(None, _submit_review, pr, event, body, comments, unanchored)
+        logger.info("Created review with event %s and %d line comments", event, len(comments))
 
         typer.echo(f"Successfully reviewed pull request: {pr.html_url}")
+        return f"{event}, {len(comments)} line comments"
 
     except Exception as e:
         typer.echo(f"Error reviewing pull request: {e}")
         raise 
 
+async def _batch(
+    command: str,
+    branch_names: List[str],
+    max_prs: Optional[int],
+    run: Callable[[object], Awaitable[Optional[str]]]
+) -> bool:
+    """
+    Run review or respond on many pull requests at once over the shared clients.
+
+    The open pull requests are listed once, in one paginated request, and processed
+    with at most `max_prs` in flight. A failure is reported against its pull request
+    without stopping the others. Prints a summary table and returns True if every
+    pull request succeeded.
+    """
+    settings = get_settings()
+    git = get_git()
+    max_prs = max(1, max_prs or settings.BATCH_PR_CONCURRENCY)
+
+    loop = asyncio.get_running_loop()
+    with span("find_pr"):
+        pulls = await loop.run_in_executor(
+            None, lambda: list(git.iterate_pages(git.repo.get_pulls(state='open')))
+        )
+    rows = []
+    if branch_names:
+        by_branch = {pr.head.ref: pr for pr in pulls}
+        pulls = [by_branch[branch] for branch in branch_names if branch in by_branch]
+        rows.extend(
+            (None, branch, "failed", 0.0, "no open pull request")
+            for branch in branch_names if branch not in by_branch
+        )
+    logger.info("Running %s on %d pull requests, %d at a time", command, len(pulls), max_prs)
+
+    async def run_one(pr) -> Tuple[int, str, str, float, str]:
+        start = time.monotonic()
+        try:
+            outcome = await run(pr)
+            return pr.number, pr.head.ref, "ok", time.monotonic() - start, outcome or ""
+        except Exception as e:
+            logger.error("%s failed on pull request #%s: %s", command.capitalize(), pr.number, e)
+            return pr.number, pr.head.ref, "failed", time.monotonic() - start, str(e).splitlines()[0] if str(e) else type(e).__name__
+
+    async for _, row in bounded_map(pulls, run_one, max_prs):
+        rows.append(row)
+
+    rows.sort(key=lambda row: (row[0] is None, row[0] or 0))
+    typer.echo(f"\n{'PR':>6}  {'branch':<40} {'status':<7} {'secs':>7}  outcome")
+    for number, branch, status, seconds, outcome in rows:
+        typer.echo(f"{'#' + str(number) if number else '-':>6}  {branch:<40} {status:<7} {seconds:7.1f}  {outcome}")
+    failed = sum(1 for row in rows if row[2] != "ok")
+    typer.echo(f"{len(rows) - failed} of {len(rows)} pull requests {command}ed successfully")
+    return failed == 0
+
+@app.command()
+def serve(
+    host: str = typer.Option(None, "--host", help="Address to listen on"),
+    port: int = typer.Option(None, "--port", help="Port to listen on"),
+    workers: int = typer.Option(None, "--workers", help="Number of jobs to run at once")
+):
+    """Run a webhook server that reviews and responds to pull requests as events arrive."""
+    try:
+        asyncio.run(_serve(host, port, workers))
+    except KeyboardInterrupt:
+        typer.echo("Shutting down")
+    finally:
+        _report_run()
+
+async def _run_job(job) -> str:
+    """Run a queued webhook job with the shared, already warm clients. Returns the PR head SHA it ran on."""
+    # The event named the pull request; a lookup by head branch could pick a closed
+    # pull request or miss one from a fork
+    loop = asyncio.get_running_loop()
+    pr = await loop.run_in_executor(None, get_git().repo.get_pull, job.pr)
+    if job.kind == "review":
+        await _review(pr.head.ref, approve=False, pr=pr)
+    elif job.kind == "respond":
+        await _respond(pr.head.ref, pr=pr)
+    return pr.head.sha
+
+async def _serve(host: Optional[str], port: Optional[int], workers: Optional[int]):
+    """Async implementation of serve command."""
+    from .core.server.jobs import JobQueue
+    from .core.server.webhook import WebhookServer
+
+    settings = get_settings()
+    git = get_git()
+    get_llm("review")
+    get_llm("respond")
+    state = get_state()
+
+    # Authenticate and look up the repository once, up front, instead of on every job
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, lambda: git.repo)
+
+    # Ignore the events the agent causes itself, or its replies and commits would
+    # trigger more jobs
+    agent_login = await loop.run_in_executor(None, lambda: git.agent_login)
+
+    queue = JobQueue(_run_job, workers or settings.SERVE_WORKERS)
+    server = WebhookServer(
+        queue,
+        f"{settings.GITHUB_REPO_OWNER}/{settings.GITHUB_REPO_NAME}",
+        secret=settings.GITHUB_WEBHOOK_SECRET,
+        host=host or settings.SERVE_HOST,
+        port=port or settings.SERVE_PORT,
+        ignore_sender=agent_login
+    )
+    queue.start()
+    await server.start()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        await queue.stop()
+        # The workers are stopped, so nothing uses the state store any more
+        state.close()
+
+def _log_llm_stats():
+    """Log LLM cache, rate limiter and latency counters for this run."""
+    for name, llm in _backends.items():
+        metrics = llm.metrics()
+        cache = metrics.get("cache")
+        if cache and cache["enabled"]:
+            logger.info("LLM cache (%s): %d hits, %d misses", name, cache['hits'], cache['misses'])
+        limiter = metrics.get("limiter")
+        if limiter:
+            logger.info(
+                "LLM rate limiter (%s): %d calls, %d throttled, max queue depth %d, avg wait %.2fs, max wait %.2fs, concurrency limit %s",
+                name, limiter['calls'], limiter['throttled'], limiter['max_queue_depth'],
+                limiter['avg_wait'], limiter['max_wait'], limiter['concurrency_limit']
+            )
+    for llm in _llms.values():
+        metrics = llm.metrics()
+        for call, latency in metrics["latency"].items():
+            if not latency["count"]:
+                continue
+            logger.info(
+                "LLM latency (%s): %d calls, mean %.2fs, p50 %ss, p90 %ss, p99 %ss",
+                call, latency['count'], latency['mean'], latency['p50'], latency['p90'], latency['p99']
+            )
+        if metrics["hedged"] or metrics["fallbacks"]:
+            logger.info(
+                "LLM chain %s: %d hedged, %d fallbacks, wins %s",
+                " -> ".join(metrics["chain"]), metrics['hedged'], metrics['fallbacks'], metrics['wins']
+            )
+
+def _report_run():
+    """Log the LLM counters and the run's stage timings, and write the metrics file if configured."""
+    _log_llm_stats()
+    logger.info("Run metrics:\n%s", METRICS.summary())
+    # Nothing ran if the settings could not be loaded
+    path = _settings.METRICS_FILE if _settings is not None else ""
+    if path:
+        try:
+            METRICS.write(path)
+            logger.info("Wrote metrics to %s", path)
+        except OSError as e:
+            logger.warning("Failed to write metrics to %s: %s", path, e)
+
 @app.callback()
-def main():
+def main(
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the LLM response cache"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Log debug output, including prompts and responses"),
+    log_level: str = typer.Option(None, "--log-level", help="Log level (DEBUG, INFO, WARNING, ERROR)"),
+    log_json: Optional[bool] = typer.Option(None, "--log-json/--log-text", help="Log one JSON object per line"),
+    metrics_file: str = typer.Option(None, "--metrics-file", help="Write run metrics to this file (JSON if it ends in .json, OpenMetrics otherwise)")
+):
     """Developer Agent CLI tool."""
-    pass
+    # Only the logging settings are loaded here, so --help works without credentials
+    from .config.settings import LoggingSettings
+    log_settings = LoggingSettings()
+    configure_logging(
+        "DEBUG" if verbose else (log_level or log_settings.LOG_LEVEL),
+        json_output=log_settings.LOG_JSON if log_json is None else log_json,
+        max_payload_chars=log_settings.LOG_MAX_PAYLOAD_CHARS
+    )
+    if no_cache:
+        _settings_overrides["LLM_CACHE_ENABLED"] = False
+    if metrics_file:
+        _settings_overrides["METRICS_FILE"] = metrics_file
 
 if __name__ == "__main__":
     app() 
\ No newline at end of file
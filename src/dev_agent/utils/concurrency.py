@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+async def bounded_map(items: Iterable[T], worker: Callable[[T], Awaitable[R]], limit: int) -> AsyncIterator[Tuple[T, R]]:
+    """
+    Run worker over items with at most limit calls in flight, yielding results as they complete.
+
+    Items are pulled from the iterable only when a slot frees up, in an executor thread,
+    so a lazily paginated listing (such as a PyGithub PaginatedList) is fetched page by
+    page as the work progresses instead of up front, without blocking the event loop.
+    If the consumer stops early or a worker fails, the calls still in flight are cancelled.
+
+    Args:
+        items (Iterable[T]): The items to process, consumed lazily.
+        worker (Callable[[T], Awaitable[R]]): The coroutine function to run on each item.
+        limit (int): The maximum number of items in flight.
+
+    Returns:
+        AsyncIterator[Tuple[T, R]]: Each item with its result, in completion order.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(items)
+    limit = max(1, limit)
+    pending = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                item = await loop.run_in_executor(None, next, iterator, _DONE)
+                if item is _DONE:
+                    exhausted = True
+                else:
+                    pending[asyncio.ensure_future(worker(item))] = item
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield pending.pop(task), task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,78 @@
+import sys
+import json
+import logging
+from typing import Optional
+
+ROOT_LOGGER = "dev_agent"
+
+# Upper bound on the characters logged for any single payload (code, prompts, responses)
+_max_payload_chars = 2000
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the dev_agent namespace."""
+    if name.startswith(f"{ROOT_LOGGER}.") or name == ROOT_LOGGER:
+        return logging.getLogger(name)
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+class Payload:
+    """
+    Lazily truncated log argument for large text such as files, prompts and responses.
+
+    Pass it as a %-style argument so the text is only measured and sliced when the
+    record is actually emitted:
+
+        logger.debug("Generated code:\\n%s", Payload(code))
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self) -> str:
+        text = self.text if isinstance(self.text, str) else str(self.text)
+        limit = _max_payload_chars
+        if limit and len(text) > limit:
+            return f"{text[:limit]}... [truncated {len(text) - limit} of {len(text)} chars]"
+        return text
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: str = "INFO", json_output: bool = False, max_payload_chars: Optional[int] = None):
+    """
+    Configure dev_agent logging.
+
+    Args:
+        level (str): Minimum level to emit (DEBUG, INFO, WARNING, ...).
+        json_output (bool): Emit one JSON object per line instead of plain text.
+        max_payload_chars (Optional[int]): Truncate Payload arguments to this many characters (0 disables truncation).
+    """
+    global _max_payload_chars
+    if max_payload_chars is not None:
+        _max_payload_chars = max_payload_chars
+
+    handler = logging.StreamHandler(sys.stderr)
+    if json_output:
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
@@ -0,0 +1,122 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    """
+    In-process registry of stage timings (spans), counters and gauges for one run.
+
+    Spans accumulate the count, total and maximum duration per stage. Spans of stages
+    that run concurrently (e.g. one per file) add up to more than the wall time.
+    Updates are thread-safe, since GitHub calls run in executor threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time a stage; works around awaits as well as blocking code."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.spans.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def increment(self, name: str, amount: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.spans.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    @staticmethod
+    def _series(name: str, labels: Labels) -> str:
+        if not labels:
+            return name
+        return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def to_dict(self) -> dict:
+        """Return the run's metrics as plain JSON-serializable data."""
+        with self._lock:
+            return {
+                "wall_seconds": round(time.monotonic() - self.started, 3),
+                "spans": {
+                    name: {"count": stats["count"], "total": round(stats["total"], 3), "max": round(stats["max"], 3)}
+                    for name, stats in sorted(self.spans.items())
+                },
+                "counters": {self._series(name, labels): value for (name, labels), value in sorted(self.counters.items())},
+                "gauges": {self._series(name, labels): value for (name, labels), value in sorted(self.gauges.items())},
+            }
+
+    def to_openmetrics(self) -> str:
+        """Render the run's metrics in the OpenMetrics text format."""
+        with self._lock:
+            lines = [
+                "# TYPE dev_agent_run_seconds gauge",
+                f"dev_agent_run_seconds {time.monotonic() - self.started:.6f}",
+                "# TYPE dev_agent_stage_seconds summary",
+            ]
+            for name, stats in sorted(self.spans.items()):
+                lines.append(f'dev_agent_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+                lines.append(f'dev_agent_stage_seconds_sum{{stage="{name}"}} {stats["total"]:.6f}')
+            lines.append("# TYPE dev_agent_stage_max_seconds gauge")
+            for name, stats in sorted(self.spans.items()):
+                lines.append(f'dev_agent_stage_max_seconds{{stage="{name}"}} {stats["max"]:.6f}')
+
+            for kind, metrics, suffix in (("counter", self.counters, "_total"), ("gauge", self.gauges, "")):
+                declared = set()
+                for (name, labels), value in sorted(metrics.items()):
+                    family = f"dev_agent_{name}"
+                    if family not in declared:
+                        lines.append(f"# TYPE {family} {kind}")
+                        declared.add(family)
+                    lines.append(f"{self._series(family + suffix, labels)} {value:g}")
+            lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Return a human-readable summary, slowest stages first."""
+        data = self.to_dict()
+        lines = [f"Run took {data['wall_seconds']:.2f}s"]
+        for name, stats in sorted(data["spans"].items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"  {name:<28} {stats['count']:>5}x  total {stats['total']:8.2f}s  max {stats['max']:7.2f}s")
+        for series, value in list(data["counters"].items()) + list(data["gauges"].items()):
+            lines.append(f"  {series:<48} {value:g}")
+        return '\n'.join(lines)
+
+    def write(self, path: str):
+        """Write the metrics to a file: JSON if it ends in .json, OpenMetrics text otherwise."""
+        content = json.dumps(self.to_dict(), indent=2) if path.endswith(".json") else self.to_openmetrics()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+# The process-wide registry
+METRICS = Metrics()
+span = METRICS.span
+increment = METRICS.increment
+set_gauge = METRICS.set_gauge
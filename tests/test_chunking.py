@@ -0,0 +1,64 @@
+from dev_agent.core.llm.chunking import split_code_into_chunks
+
+
+def make_module(functions=6, body_lines=8):
+    parts = []
+    for index in range(functions):
+        body = "\n".join(f"    value_{line} = compute({index}, {line})" for line in range(body_lines))
+        parts.append(f"def function_{index}():\n{body}\n    return value_0\n")
+    return "\n".join(parts)
+
+
+def check_chunk_lines(code, chunks):
+    lines = code.split("\n")
+    for start, text in chunks:
+        chunk_lines = text.split("\n")
+        assert chunk_lines == lines[start - 1:start - 1 + len(chunk_lines)]
+
+
+def test_small_file_is_one_chunk():
+    code = make_module(functions=2)
+    assert split_code_into_chunks(code, max_tokens=10_000, file_path="a.py") == [(1, code)]
+
+
+def test_python_chunks_start_at_definitions():
+    code = make_module()
+    chunks = split_code_into_chunks(code, max_tokens=150, file_path="a.py")
+    assert len(chunks) > 1
+    check_chunk_lines(code, chunks)
+    for start, text in chunks:
+        assert text.startswith("def function_")
+    # Every line is covered, in order, without gaps
+    covered = set()
+    for start, text in chunks:
+        covered.update(range(start, start + len(text.split("\n"))))
+    assert covered >= set(range(1, len(code.split("\n"))))
+
+
+def test_overlap_repeats_previous_lines():
+    code = make_module()
+    chunks = split_code_into_chunks(code, max_tokens=150, overlap_lines=2, file_path="a.py")
+    check_chunk_lines(code, chunks)
+    for (start, text), (next_start, _) in zip(chunks, chunks[1:]):
+        end = start + len(text.split("\n")) - 1
+        assert next_start <= end
+        assert next_start > start
+
+
+def test_other_files_split_after_blank_lines():
+    blocks = ["\n".join(f"line {block}.{index} with some words" for index in range(6)) for block in range(5)]
+    code = "\n\n".join(blocks)
+    chunks = split_code_into_chunks(code, max_tokens=80, file_path="notes.txt")
+    assert len(chunks) > 1
+    check_chunk_lines(code, chunks)
+    for start, text in chunks:
+        assert text.startswith("line ")
+
+
+def test_oversized_block_is_cut_hard():
+    code = "def huge():\n" + "\n".join(f"    x_{index} = {index}" for index in range(200))
+    chunks = split_code_into_chunks(code, max_tokens=50, file_path="a.py")
+    assert len(chunks) > 1
+    check_chunk_lines(code, chunks)
+    assert [start for start, _ in chunks] == sorted(start for start, _ in chunks)
+    assert sum(len(text.split("\n")) for _, text in chunks) == 201
@@ -0,0 +1,51 @@
+from dev_agent.core.git.diff import build_review_excerpt, parse_patch, snap_to_line
+
+PATCH = (
+    "@@ -1,3 +1,4 @@\n"
+    " import os\n"
+    "+import sys\n"
+    " \n"
+    " def main():\n"
+    "@@ -20,2 +21,3 @@ def main():\n"
+    "     a = 1\n"
+    "-    b = 2\n"
+    "+    b = 3\n"
+    "+    c = 4\n"
+    "\\ No newline at end of file"
+)
+
+
+def test_parse_patch_follows_hunk_headers():
+    new_lines, added = parse_patch(PATCH)
+    assert sorted(new_lines) == [1, 2, 3, 4, 21, 22, 23]
+    assert new_lines[2] == "import sys"
+    assert new_lines[22] == "    b = 3"
+    assert added == {2, 22, 23}
+
+
+def test_hunk_header_without_count():
+    new_lines, added = parse_patch("@@ -5 +5 @@\n-old\n+new")
+    assert new_lines == {5: "new"}
+    assert added == {5}
+
+
+def test_excerpt_numbers_lines_and_marks_gaps():
+    excerpt, commentable = build_review_excerpt(PATCH)
+    lines = excerpt.split("\n")
+    assert lines[1] == "     2+ import sys"
+    assert "   ..." in lines
+    assert commentable == [1, 2, 3, 4, 21, 22, 23]
+
+
+def test_snap_to_line_within_distance():
+    commentable = [1, 2, 3, 4, 21, 22, 23]
+    assert snap_to_line(22, commentable) == 22
+    assert snap_to_line(6, commentable) == 4
+    assert snap_to_line(19, commentable) == 21
+    assert snap_to_line(40, commentable, max_distance=20) == 23
+
+
+def test_snap_to_line_leaves_far_lines_unanchored():
+    assert snap_to_line(12, [1, 2, 3, 4, 21, 22, 23]) is None
+    assert snap_to_line(30, [1, 2, 3]) is None
+    assert snap_to_line(1, []) is None
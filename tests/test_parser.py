@@ -0,0 +1,50 @@
+from dev_agent.core.code_generator.parser import FileBlockParser
+
+
+def parse(chunks):
+    parser = FileBlockParser()
+    files = []
+    for chunk in chunks:
+        files.extend(parser.feed(chunk))
+    files.extend(parser.close())
+    return files
+
+
+OUTPUT = (
+    "Here are the files.\n"
+    "=== FILE: src/app.py ===\n"
+    "```python\n"
+    "def main():\n"
+    "    return 1\n"
+    "```\n"
+    "=== FILE: /README.md ===\n"
+    "# App\n"
+    "=== FILE: END ===\n"
+    "Trailing notes are ignored.\n"
+)
+
+
+def test_parses_blocks_and_strips_fences():
+    assert parse([OUTPUT]) == [
+        ("src/app.py", "def main():\n    return 1"),
+        ("README.md", "# App"),
+    ]
+
+
+def test_chunk_boundaries_do_not_matter():
+    expected = parse([OUTPUT])
+    assert parse(list(OUTPUT)) == expected
+    for size in (2, 5, 13, 64):
+        assert parse([OUTPUT[i:i + size] for i in range(0, len(OUTPUT), size)]) == expected
+
+
+def test_blocks_are_returned_as_soon_as_they_close():
+    parser = FileBlockParser()
+    assert parser.feed("=== FILE: a.py ===\nx = 1\n") == []
+    assert parser.feed("=== FILE: b.py ===\n") == [("a.py", "x = 1")]
+    assert parser.feed("y = 2") == []
+    assert parser.close() == [("b.py", "y = 2")]
+
+
+def test_text_without_blocks_yields_nothing():
+    assert parse(["no files here\n", "```\ncode\n```"]) == []